@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.database import Database
+from utils.database import get_database
 import pandas as pd
 
 # Page config
@@ -12,7 +12,7 @@ st.set_page_config(
 
 # Initialize database
 if 'db' not in st.session_state:
-    st.session_state.db = Database()
+    st.session_state.db = get_database()
 
 # Custom CSS
 st.markdown("""
@@ -144,18 +144,20 @@ else:
     
     # System info
     with st.expander("ℹ️ About This System"):
-        st.markdown("""
+        rubric = st.session_state.db.get_rubric()
+        w = {k: f"{v * 100:.0f}%" for k, v in rubric.weights.items()}
+        st.markdown(f"""
         **Scoring Criteria & Weights:**
-        - 🏛️ Regulatory Risk: 25%
-        - 🛡️ Reputational/Ethical Risk: 20%
-        - 🎯 Strategic Alignment: 15%
-        - ⚙️ Operational Impact: 15%
-        - 💰 Resource Requirements: 10%
-        - 🔒 Data Sensitivity: 10%
-        - 👥 Stakeholder Pressure: 5%
+        - 🏛️ Regulatory Risk: {w['reg']}
+        - 🛡️ Reputational/Ethical Risk: {w['rep']}
+        - 🎯 Strategic Alignment: {w['strat']}
+        - ⚙️ Operational Impact: {w['op']}
+        - 💰 Resource Requirements: {w['res']}
+        - 🔒 Data Sensitivity: {w['data']}
+        - 👥 Stakeholder Pressure: {w['stake']}
         
         **Priority Thresholds:**
-        - 🔴 IMMEDIATE: Score ≥ 70
-        - 🟡 PLANNED: Score 50-69
-        - ⚪ DEFER: Score < 50
+        - 🔴 IMMEDIATE: Score ≥ {rubric.immediate_threshold:g}
+        - 🟡 PLANNED: Score ≥ {rubric.planned_threshold:g} and < {rubric.immediate_threshold:g}
+        - ⚪ DEFER: Score < {rubric.planned_threshold:g}
         """)
@@ -1,7 +1,7 @@
 import streamlit as st
 from datetime import datetime
 import pandas as pd
-from utils.database import Database
+from utils.database import get_database
 from utils.scoring import *
 
 st.set_page_config(page_title="New Request", page_icon="📝", layout="wide")
@@ -12,7 +12,7 @@ if 'authenticated' not in st.session_state or not st.session_state.authenticated
     st.stop()
 
 if 'db' not in st.session_state:
-    st.session_state.db = Database()
+    st.session_state.db = get_database()
 
 st.title("📝 Submit New Project Request")
 
@@ -256,19 +256,20 @@ with st.form("project_request"):
         if not project_title or not requestor_name or not requestor_email:
             st.error("❌ Please fill all required fields marked with *")
         else:
-            # Calculate scores
+            # Calculate scores with the active rubric
+            rubric = st.session_state.db.get_rubric()
             scores = {
-                'reg': calculate_regulatory_score(reg_required, reg_deadline, reg_enforcement),
-                'rep': calculate_reputational_score(rep_risk_level, ','.join(rep_harm_categories), rep_liability),
-                'strat': calculate_strategic_score(strat_document, strat_sponsor, strat_budget),
-                'op': calculate_operational_score(op_efficiency_gain, op_scope, op_blocker),
-                'res': calculate_resource_score(res_approach, 0, ''),  # No external deps from requestor,
-                'data': calculate_data_score(data_type, data_third_party, "N/A"),
-                'stake': calculate_stakeholder_score(stake_requestor_level, stake_urgency_clear)
+                'reg': calculate_regulatory_score(reg_required, reg_deadline, reg_enforcement, rubric=rubric),
+                'rep': calculate_reputational_score(rep_risk_level, ','.join(rep_harm_categories), rep_liability, rubric=rubric),
+                'strat': calculate_strategic_score(strat_document, strat_sponsor, strat_budget, rubric=rubric),
+                'op': calculate_operational_score(op_efficiency_gain, op_scope, op_blocker, rubric=rubric),
+                'res': calculate_resource_score(res_approach, 0, '', rubric=rubric),  # No external deps from requestor,
+                'data': calculate_data_score(data_type, data_third_party, "N/A", rubric=rubric),
+                'stake': calculate_stakeholder_score(stake_requestor_level, stake_urgency_clear, rubric=rubric)
             }
             
-            total_score = calculate_total_score(scores)
-            priority = get_priority(total_score)
+            total_score = calculate_total_score(scores, rubric)
+            priority = get_priority(total_score, rubric)
             
             # Prepare data
             project_data = {
@@ -301,6 +302,7 @@ with st.form("project_request"):
                 'op_projected_time': op_projected_time,
                 'op_efficiency_gain': op_efficiency_gain,
                 'op_scope': op_scope,
+                'op_blocker': op_blocker,
                 'op_score': scores['op'],
                 
                 'res_approach': res_approach,
@@ -318,7 +320,8 @@ with st.form("project_request"):
                 'stake_score': scores['stake'],
                 
                 'total_score': total_score,
-                'priority': priority
+                'priority': priority,
+                'rubric_version': rubric.version
             }
             
             # Check red flags
@@ -328,7 +331,7 @@ with st.form("project_request"):
             
             # Submit to database
             try:
-                project_id = st.session_state.db.submit_project(project_data)
+                project_id = st.session_state.db.submit_project(project_data, st.session_state.user['username'])
                 
                 st.success(f"✅ Project submitted successfully! (Reference ID: {project_id})")
                 st.info("""
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.database import Database
+from utils.database import ConcurrencyError, ProjectCache, get_database
 from utils.scoring import calculate_total_score, get_priority
+from utils.rubric import SECTIONS
+from utils.scheduler import AT_RISK_HOURS, sla_status
 
 st.set_page_config(page_title="Review Queue", page_icon="⚖️", layout="wide")
 
@@ -16,15 +18,99 @@ if st.session_state.user['role'] != 'compliance_officer':
     st.stop()
 
 if 'db' not in st.session_state:
-    st.session_state.db = Database()
+    st.session_state.db = get_database()
+
+# Recently viewed and upcoming projects for this reviewer
+if 'project_cache' not in st.session_state:
+    st.session_state.project_cache = ProjectCache(st.session_state.db)
+
+# Projects after the selected one to load ahead of time
+PREFETCH_COUNT = 5
+
+# Projects listed under Next Due
+NEXT_DUE_COUNT = 10
+
+# Next Item remembers at most this many passed-over projects
+MAX_SKIPPED = 50
+
+# Queue sort orders (see QUEUE_SORTS in utils/database.py) and page sizes
+SORT_OPTIONS = {
+    'due': "SLA due (breach risk first)",
+    'newest': "Newest",
+    'oldest': "Oldest first (age)",
+    'score': "Highest score",
+    'priority': "Priority"
+}
+PAGE_SIZES = [25, 50, 100, 200, 500]
+
+SECTION_NAMES = dict(zip(SECTIONS, ['Regulatory', 'Reputational', 'Strategic', 'Operational',
+                                    'Resources', 'Data', 'Stakeholder']))
+
+# Status set by each review decision
+DECISION_STATUS = {
+    "Approve": "Approved",
+    "Approve with Conditions": "Approved",
+    "Request More Info": "Info Requested",
+    "Reject": "Rejected"
+}
+BULK_ACTIONS = ["Approve", "Reject", "Request More Info", "Reassign", "Apply Score Override"]
+
+
+def claim_next_item():
+    """Next Item callback: pass over the open project and lease the next one"""
+    username = st.session_state.user['username']
+    skipped = st.session_state.setdefault('skipped_projects', [])
+    current = st.session_state.get('open_project_id')
+    if current:
+        skipped.append(current)
+        del skipped[:-MAX_SKIPPED]
+        st.session_state.db.release_lease(current, username)
+    next_id = st.session_state.db.claim_next(username, exclude=skipped)
+    if next_id is None and skipped:
+        # Everything left was passed over: start again from the top of the queue
+        skipped.clear()
+        next_id = st.session_state.db.claim_next(username)
+    st.session_state['open_project_id'] = next_id or 0
+    if next_id is None:
+        st.session_state['queue_message'] = "No unclaimed projects left in the queue"
+
 
 st.title("⚖️ Review Queue - Compliance Officer")
 
+# SLA overview: counts and the earliest deadlines come from the deadline index
+sla_summary = st.session_state.db.get_sla_summary()
+col1, col2, _ = st.columns([1, 1, 2])
+with col1:
+    st.metric("⏰ Overdue", sla_summary['overdue'])
+with col2:
+    st.metric(f"⚠️ Due within {AT_RISK_HOURS}h", sla_summary['at_risk'])
+
+with st.expander("⏰ Next Due", expanded=sla_summary['overdue'] > 0):
+    due = st.session_state.db.next_due(NEXT_DUE_COUNT)
+    if len(due) == 0:
+        st.info("No open projects with an SLA deadline")
+    else:
+        due.insert(0, 'sla_status', sla_status(due['sla_deadline']))
+        st.dataframe(
+            due[['sla_status', 'sla_deadline', 'id', 'project_title', 'priority', 'status', 'assigned_to']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "sla_status": st.column_config.TextColumn("SLA"),
+                "sla_deadline": st.column_config.DatetimeColumn("Due", format="DD/MM/YYYY HH:mm"),
+                "id": st.column_config.NumberColumn("ID", width="small")
+            }
+        )
+
+# Full-text search
+search_text = st.text_input("🔍 Search requests",
+    placeholder="Title, headline, process, regulation, urgency or reviewer notes...")
+
 # Filters
 col1, col2, col3 = st.columns(3)
 with col1:
     status_filter = st.selectbox("Filter by Status", 
-        ["All", "Submitted", "Under Review", "Approved", "Rejected", "Deleted"])
+        ["All", "Submitted", "Under Review", "Info Requested", "Approved", "Rejected", "Deleted"])
 with col2:
     priority_filter = st.selectbox("Filter by Priority",
         ["All", "🔴 IMMEDIATE", "🟡 PLANNED", "⚪ DEFER"])
@@ -32,32 +118,56 @@ with col3:
     dept_filter = st.selectbox("Filter by Department",
         ["All", "IT", "Finance", "HR", "Operations", "Sales", "Legal", "Compliance", "Other"])
 
-# Get projects
-if status_filter == "All":
-    projects = st.session_state.db.get_projects()
-else:
-    projects = st.session_state.db.get_projects(status=status_filter)
+# Sort order and page size
+col1, col2 = st.columns([3, 1])
+with col1:
+    sort_order = st.radio("Sort by", list(SORT_OPTIONS), format_func=SORT_OPTIONS.get, horizontal=True)
+with col2:
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
 
-# Filter out deleted projects unless specifically requested
-if status_filter != "Deleted":
-    if 'deleted' in projects.columns:
-        projects = projects[projects['deleted'] == 0]
+# Columns shown in the queue table
+display_cols = ['id', 'project_title', 'requestor_name', 'department', 
+                'total_score', 'priority', 'status', 'sla_deadline', 'assigned_to', 'submission_date']
 
-# Apply additional filters
-if priority_filter != "All":
-    projects = projects[projects['priority'] == priority_filter]
-if dept_filter != "All":
-    projects = projects[projects['department'] == dept_filter]
+# Get projects (filters run in SQL; deleted projects only when specifically requested)
+filters = {
+    'status': None if status_filter == "All" else status_filter,
+    'priority': None if priority_filter == "All" else priority_filter,
+    'department': None if dept_filter == "All" else dept_filter,
+    'include_deleted': status_filter == "Deleted"
+}
+if search_text.strip():
+    projects = st.session_state.db.search_projects(search_text, filters, limit=200)
+    display_cols = display_cols + ['snippet']
+    total_projects = len(projects)
+    page_keys = None
+else:
+    # Keyset pagination: one key per page already visited, reset when filters or sort change
+    filter_key = repr((sorted((k, str(v)) for k, v in filters.items()), sort_order, page_size))
+    if st.session_state.get('queue_filter_key') != filter_key:
+        st.session_state['queue_filter_key'] = filter_key
+        st.session_state['queue_page_keys'] = [None]
+        st.session_state.pop('skipped_projects', None)
+    page_keys = st.session_state['queue_page_keys']
+    
+    total_projects = st.session_state.db.count_projects(**filters)
+    projects = st.session_state.db.get_projects(**filters, columns=display_cols, sort=sort_order,
+                                                after=page_keys[-1], limit=page_size)
+    if len(projects) == 0 and len(page_keys) > 1:
+        # Reviews emptied the page we were on; start again from the first page
+        page_keys[:] = [None]
+        st.rerun()
 
-st.markdown(f"### Found {len(projects)} projects")
+# Overdue / at-risk flag per row from the stored deadline
+projects['sla_status'] = sla_status(projects['sla_deadline'])
+display_cols.insert(display_cols.index('sla_deadline'), 'sla_status')
+
+st.markdown(f"### Found {total_projects} projects")
 
 if len(projects) == 0:
     st.info("No projects found with selected filters.")
 else:
-    # Display projects table
-    display_cols = ['id', 'project_title', 'requestor_name', 'department', 
-                    'total_score', 'priority', 'status', 'submission_date']
-    
+    # Display projects table (one page)
     st.dataframe(
         projects[display_cols],
         use_container_width=True,
@@ -65,22 +175,183 @@ else:
         column_config={
             "id": st.column_config.NumberColumn("ID", width="small"),
             "total_score": st.column_config.NumberColumn("Score", format="%.1f"),
-            "submission_date": st.column_config.DatetimeColumn("Submitted", format="DD/MM/YYYY HH:mm")
+            "sla_status": st.column_config.TextColumn("SLA"),
+            "sla_deadline": st.column_config.DatetimeColumn("SLA Due", format="DD/MM/YYYY HH:mm"),
+            "assigned_to": st.column_config.TextColumn("Assigned To"),
+            "submission_date": st.column_config.DatetimeColumn("Submitted", format="DD/MM/YYYY HH:mm"),
+            "snippet": st.column_config.TextColumn("Match", width="large")
         }
     )
     
+    if page_keys is not None:
+        col1, col2, col3 = st.columns([1, 1, 2])
+        
+        with col1:
+            if st.button("⬅️ Previous", use_container_width=True, disabled=len(page_keys) == 1):
+                page_keys.pop()
+                st.rerun()
+        
+        with col2:
+            if st.button("Next ➡️", use_container_width=True, disabled=len(projects) < page_size):
+                page_keys.append(st.session_state.db.next_page_key(projects))
+                st.rerun()
+        
+        with col3:
+            st.caption(f"Page {len(page_keys)} of {max(1, -(-total_projects // page_size))}")
+    
+    # Bulk actions: one transaction, one audit batch and one rerun for many projects
+    with st.expander("📦 Bulk Actions", expanded=bool(st.session_state.get('bulk_result'))):
+        if st.session_state.get('bulk_result'):
+            st.success(st.session_state.pop('bulk_result'))
+        
+        bulk_scope = st.radio("Apply to", ["Selected projects", f"All {total_projects} matching projects"],
+                              horizontal=True)
+        if bulk_scope == "Selected projects":
+            page_titles = dict(zip(projects['id'].tolist(), projects['project_title']))
+            bulk_ids = st.multiselect("Projects", list(page_titles),
+                                      format_func=lambda pid: f"#{pid} - {page_titles[pid]}",
+                                      placeholder="Choose projects from this page")
+        elif page_keys is None:
+            bulk_ids = projects['id'].tolist()
+        else:
+            bulk_ids = st.session_state.db.get_projects(**filters, columns=['id'])['id'].tolist()
+        
+        bulk_action = st.selectbox("Action", BULK_ACTIONS)
+        if bulk_action == "Apply Score Override":
+            override_sections = st.multiselect("Sections to override", SECTIONS, format_func=SECTION_NAMES.get)
+        
+        with st.form("bulk_form"):
+            if bulk_action == "Reassign":
+                reassign_to = st.selectbox("Reassign to",
+                                           st.session_state.db.get_usernames(role='compliance_officer'))
+            elif bulk_action == "Apply Score Override":
+                bulk_overrides = {
+                    section: st.slider(f"{SECTION_NAMES[section]} score", min_value=1.0, max_value=5.0,
+                                       value=3.0, step=0.5, key=f"bulk_override_{section}")
+                    for section in override_sections
+                }
+            
+            bulk_notes = st.text_area("Notes (applied to every project)",
+                                      placeholder="Example: Quarterly review - low-value requests without sponsor...")
+            submit_bulk = st.form_submit_button(f"Apply to {len(bulk_ids)} projects", type="primary")
+        
+        if submit_bulk:
+            if not bulk_ids:
+                st.error("❌ Select at least one project")
+            elif not bulk_notes or len(bulk_notes) < 10:
+                st.error("❌ Notes are required (minimum 10 characters)")
+            elif bulk_action == "Apply Score Override" and not bulk_overrides:
+                st.error("❌ Choose at least one section to override")
+            else:
+                reviewed = {
+                    'co_reviewed_by': st.session_state.user['username'],
+                    'co_reviewed_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+                if bulk_action in DECISION_STATUS:
+                    update_data = {'status': DECISION_STATUS[bulk_action], 'co_decision': bulk_action,
+                                   'co_notes': bulk_notes, **reviewed}
+                    updates = {pid: update_data for pid in bulk_ids}
+                    audit_action, details = 'Project Reviewed', f"Bulk decision: {bulk_action}"
+                elif bulk_action == "Reassign":
+                    updates = {pid: {'assigned_to': reassign_to, 'co_notes': bulk_notes} for pid in bulk_ids}
+                    audit_action, details = 'Project Reassigned', f"Bulk reassigned to {reassign_to}"
+                else:
+                    # Final score per project: new overrides, else earlier overrides, else raw scores,
+                    # totalled with the rubric version the project's scores came from
+                    updates = {}
+                    for pid, current in st.session_state.db.get_projects_by_id(bulk_ids).items():
+                        rubric = st.session_state.db.get_rubric(current.get('rubric_version') or 1)
+                        final_scores = {
+                            s: bulk_overrides.get(s, current.get(f'co_override_{s}') or current.get(f'{s}_score') or 0)
+                            for s in SECTIONS
+                        }
+                        final_total = calculate_total_score(final_scores, rubric)
+                        updates[pid] = {
+                            **{f'co_override_{s}': value for s, value in bulk_overrides.items()},
+                            'co_final_score': final_total,
+                            'priority': get_priority(final_total, rubric),
+                            'co_notes': bulk_notes,
+                            'status': 'Under Review',
+                            **reviewed
+                        }
+                    audit_action, details = 'Scores Overridden', bulk_notes
+                
+                try:
+                    count = st.session_state.db.bulk_update_projects(
+                        updates, audit_action, st.session_state.user['username'], details
+                    )
+                    st.session_state['bulk_result'] = f"✅ {bulk_action}: {count} projects updated"
+                    st.rerun()
+                except (ValueError, ConcurrencyError) as e:
+                    st.error(f"❌ {e}")
+    
     st.markdown("---")
     
     # Project review section
     st.markdown("### 📋 Review Project Details")
     
+    # Pick from this page (type to filter by ID or title), open any project by ID,
+    # or claim the next unclaimed project in priority order
+    if st.session_state.get('queue_message'):
+        st.info(st.session_state.pop('queue_message'))
+    st.button("▶️ Next Item", on_click=claim_next_item,
+              help="Lease the open project closest to its SLA deadline that nobody else is reviewing")
+    
     project_ids = projects['id'].tolist()
-    selected_id = st.selectbox("Select Project ID to Review", project_ids)
+    titles = dict(zip(project_ids, projects['project_title']))
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        selected_id = st.selectbox("Select Project to Review", project_ids,
+                                   format_func=lambda pid: f"#{pid} - {titles[pid]}")
+    with col2:
+        lookup_id = st.number_input("Open by ID", min_value=0, value=0, step=1, key='open_project_id',
+                                    help="Open a project that is not on this page (0 uses the list)")
+    if lookup_id:
+        selected_id = int(lookup_id)
     
     if selected_id:
-        project = st.session_state.db.get_project(selected_id)
+        project = st.session_state.project_cache.get(selected_id)
+        
+        # Load the next few projects in queue order so stepping forward is instant
+        if selected_id in titles:
+            position = project_ids.index(selected_id)
+            st.session_state.project_cache.prefetch(project_ids[position + 1:position + 1 + PREFETCH_COUNT])
+        
+        if project is None:
+            st.warning(f"Project #{selected_id} not found")
         
         if project:
+            # Lease the project while it is open here; another reviewer's lease makes it read-only
+            username = st.session_state.user['username']
+            leased_id = st.session_state.get('leased_project_id')
+            if leased_id and leased_id != selected_id:
+                st.session_state.db.release_lease(leased_id, username)
+            read_only = not st.session_state.db.claim_project(selected_id, username)
+            if read_only:
+                st.session_state.pop('leased_project_id', None)
+                lease = st.session_state.db.get_leases([selected_id]).get(selected_id)
+                holder = lease['username'] if lease else "Another reviewer"
+                until = f" until {lease['expires_date']}" if lease else ""
+                st.warning(f"🔒 {holder} is reviewing this project{until}. Saving is disabled.")
+            else:
+                st.session_state['leased_project_id'] = selected_id
+            
+            # Row version the reviewer is looking at; saves fail if someone else has written since
+            if st.session_state.get('review_version', (None, None))[0] != selected_id:
+                st.session_state['review_version'] = (selected_id, project['change_seq'])
+            review_seq = st.session_state['review_version'][1]
+            if review_seq != project['change_seq']:
+                st.warning("⚠️ This project was changed by someone else since you opened it.")
+                if st.button("🔄 Load latest version"):
+                    st.session_state.pop('review_version', None)
+                    st.rerun()
+            
+            # Rubric the stored scores came from. Edits here re-total with it and keep
+            # the row's rubric_version; a re-score job moves projects to a new version.
+            scored_version = project.get('rubric_version')
+            project_rubric = st.session_state.db.get_rubric(scored_version if pd.notna(scored_version) else 1)
+            
             # Display project info
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -169,7 +440,7 @@ else:
                             help="Optional: provide context for future reference"
                         )
                         
-                        submit_deps = st.form_submit_button("💾 Save Dependencies Assessment")
+                        submit_deps = st.form_submit_button("💾 Save Dependencies Assessment", disabled=read_only)
                         
                         if submit_deps:
                             from utils.scoring import calculate_resource_score, calculate_total_score, get_priority
@@ -178,7 +449,8 @@ else:
                             new_res_score = calculate_resource_score(
                                 project.get('res_approach', ''),
                                 0,
-                                ','.join(new_external_deps)
+                                ','.join(new_external_deps),
+                                rubric=project_rubric
                             )
                             
                             # Recalculate total
@@ -191,8 +463,8 @@ else:
                                 'data': project.get('data_score', 0),
                                 'stake': project.get('stake_score', 0)
                             }
-                            new_total = calculate_total_score(scores)
-                            new_priority = get_priority(new_total)
+                            new_total = calculate_total_score(scores, project_rubric)
+                            new_priority = get_priority(new_total, project_rubric)
                             
                             update_data = {
                                 'res_external_deps': ','.join(new_external_deps),
@@ -203,12 +475,17 @@ else:
                                 'co_reviewed_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                             }
                             
-                            st.session_state.db.update_project(selected_id, update_data)
-                            st.success("✅ External dependencies assessment saved and score updated")
-                            
-                            import time
-                            time.sleep(1)
-                            st.rerun()
+                            try:
+                                st.session_state.db.update_project(selected_id, update_data, action='Dependencies Assessed',
+                                                                   expected_seq=review_seq)
+                                st.session_state.pop('review_version', None)
+                                st.success("✅ External dependencies assessment saved and score updated")
+                                
+                                import time
+                                time.sleep(1)
+                                st.rerun()
+                            except ConcurrencyError as e:
+                                st.error(f"❌ {e}. Reload the project to see the latest version.")
                 
                 st.markdown("#### 6. Data & Privacy Considerations")
                 st.text_input("Data Type", project.get('data_type', ''), disabled=True)
@@ -222,8 +499,7 @@ else:
                 st.markdown("#### Current Scoring Breakdown")
                 
                 score_data = {
-                    'Criterion': ['Regulatory', 'Reputational', 'Strategic', 'Operational', 
-                                 'Resources', 'Data', 'Stakeholder'],
+                    'Criterion': [SECTION_NAMES[s] for s in SECTIONS],
                     'Raw Score': [
                         project.get('reg_score', 0),
                         project.get('rep_score', 0),
@@ -233,15 +509,10 @@ else:
                         project.get('data_score', 0),
                         project.get('stake_score', 0)
                     ],
-                    'Weight': ['25%', '20%', '15%', '15%', '10%', '10%', '5%'],
+                    'Weight': [f"{project_rubric.weights[s] * 100:.0f}%" for s in SECTIONS],
                     'Weighted': [
-                        project.get('reg_score', 0) * 5,
-                        project.get('rep_score', 0) * 4,
-                        project.get('strat_score', 0) * 3,
-                        project.get('op_score', 0) * 3,
-                        project.get('res_score', 0) * 2,
-                        project.get('data_score', 0) * 2,
-                        project.get('stake_score', 0) * 1
+                        (project.get(f'{s}_score', 0) or 0) * project_rubric.weights[s] * 20
+                        for s in SECTIONS
                     ]
                 }
                 
@@ -253,6 +524,8 @@ else:
                     st.metric("Total Score", f"{project.get('total_score', 0):.1f}/100")
                 with col2:
                     st.metric("Priority", project.get('priority', 'N/A'))
+                
+                st.caption(f"Scored with rubric version {project_rubric.version}")
             
             with tab3:
                 st.markdown("#### Override Scores")
@@ -473,7 +746,7 @@ else:
                     else:
                         st.success("✓ No changes made to original scores")
                     
-                    submit_override = st.form_submit_button("💾 Save Adjustments", use_container_width=True, type="primary")
+                    submit_override = st.form_submit_button("💾 Save Adjustments", use_container_width=True, type="primary", disabled=read_only)
                     
                     if submit_override:
                         if changes and (not override_notes or len(override_notes) < 10):
@@ -489,8 +762,8 @@ else:
                                 'stake': override_stake
                             }
                             
-                            final_total = calculate_total_score(final_scores)
-                            final_priority = get_priority(final_total)
+                            final_total = calculate_total_score(final_scores, project_rubric)
+                            final_priority = get_priority(final_total, project_rubric)
                             
                             update_data = {
                                 'co_reviewed_by': st.session_state.user['username'],
@@ -508,23 +781,28 @@ else:
                                 'status': 'Under Review'
                             }
                             
-                            st.session_state.db.update_project(selected_id, update_data)
-                            
-                            original_total = project.get('total_score', 0)
-                            st.success(f"✅ Adjustments saved successfully!")
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.metric("Original Total", f"{original_total:.1f}", delta=None)
-                            with col2:
-                                delta_val = final_total - original_total
-                                st.metric("New Total", f"{final_total:.1f}", delta=f"{delta_val:+.1f}")
-                            
-                            st.info(f"Priority: {final_priority}")
-                            
-                            import time
-                            time.sleep(2)
-                            st.rerun()
+                            try:
+                                st.session_state.db.update_project(selected_id, update_data, action='Scores Overridden',
+                                                                   details=override_notes, expected_seq=review_seq)
+                                st.session_state.pop('review_version', None)
+                                
+                                original_total = project.get('total_score', 0)
+                                st.success(f"✅ Adjustments saved successfully!")
+                                
+                                col1, col2 = st.columns(2)
+                                with col1:
+                                    st.metric("Original Total", f"{original_total:.1f}", delta=None)
+                                with col2:
+                                    delta_val = final_total - original_total
+                                    st.metric("New Total", f"{final_total:.1f}", delta=f"{delta_val:+.1f}")
+                                
+                                st.info(f"Priority: {final_priority}")
+                                
+                                import time
+                                time.sleep(2)
+                                st.rerun()
+                            except ConcurrencyError as e:
+                                st.error(f"❌ {e}. Reload the project to see the latest version.")
             
             with tab4:
                 st.markdown("#### Final Decision")
@@ -541,7 +819,7 @@ else:
                     st.error("⚠️ Invalid score value in database.")
                     final_score = 0.0
                 
-                current_priority = get_priority(final_score)
+                current_priority = get_priority(final_score, project_rubric)
                 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -550,42 +828,40 @@ else:
                     st.metric("Priority", current_priority)
                 
                 with st.form(f"decision_form_{selected_id}"):
-                    decision = st.radio("Decision", 
-                        ["Approve", "Approve with Conditions", "Request More Info", "Reject"])
+                    decision = st.radio("Decision", list(DECISION_STATUS))
                     
                     decision_notes = st.text_area(
                         "Decision Notes/Feedback for Requestor",
                         placeholder="Provide clear feedback on your decision and any next steps required..."
                     )
                     
-                    submit_decision = st.form_submit_button("✅ Submit Decision", type="primary", use_container_width=True)
+                    submit_decision = st.form_submit_button("✅ Submit Decision", type="primary", use_container_width=True, disabled=read_only)
                     
                     if submit_decision:
                         if not decision_notes or len(decision_notes) < 10:
                             st.error("❌ Decision notes are required (minimum 10 characters)")
                         else:
-                            status_map = {
-                                "Approve": "Approved",
-                                "Approve with Conditions": "Approved",
-                                "Request More Info": "Info Requested",
-                                "Reject": "Rejected"
-                            }
-                            
                             update_data = {
-                                'status': status_map[decision],
+                                'status': DECISION_STATUS[decision],
                                 'co_decision': decision,
                                 'co_notes': decision_notes,
                                 'co_reviewed_by': st.session_state.user['username'],
                                 'co_reviewed_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                             }
                             
-                            st.session_state.db.update_project(selected_id, update_data)
-                            st.success(f"✅ Decision submitted: {decision}")
-                            st.balloons()
-                            
-                            import time
-                            time.sleep(2)
-                            st.rerun()
+                            try:
+                                st.session_state.db.update_project(selected_id, update_data, action='Project Reviewed',
+                                                                   details=f"Decision: {decision}", expected_seq=review_seq)
+                                st.session_state.pop('review_version', None)
+                                st.session_state.db.release_lease(selected_id, st.session_state.user['username'])
+                                st.success(f"✅ Decision submitted: {decision}")
+                                st.balloons()
+                                
+                                import time
+                                time.sleep(2)
+                                st.rerun()
+                            except ConcurrencyError as e:
+                                st.error(f"❌ {e}. Reload the project to see the latest version.")
                 
                 st.markdown("---")
                 st.markdown("### ⚠️ Delete Project")
@@ -608,7 +884,7 @@ else:
                         
                         delete_confirm = st.checkbox("I confirm that I want to delete this project")
                         
-                        submit_delete = st.form_submit_button("🗑️ Delete Project", type="secondary")
+                        submit_delete = st.form_submit_button("🗑️ Delete Project", type="secondary", disabled=read_only)
                         
                         if submit_delete:
                             if not delete_confirm:
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from utils.database import Database
+from utils.database import get_database
+from utils.exports import EXPORT_FORMATS, export_available, export_file_name, job_progress, read_export, submit_export
 
 st.set_page_config(page_title="Dashboard", page_icon="📊", layout="wide")
 
@@ -11,38 +12,50 @@ if 'authenticated' not in st.session_state or not st.session_state.authenticated
     st.stop()
 
 if 'db' not in st.session_state:
-    st.session_state.db = Database()
+    st.session_state.db = get_database()
+
+
+def export_download(job, label, file_name):
+    """Download button for a finished export job.
+    
+    The file is read only after "Prepare" is clicked, for one job at a
+    time, so reruns do not load finished exports into memory.
+    """
+    if not export_available(job):
+        st.info(f"{label} has expired - start a new export")
+        return
+    if st.session_state.get('prepared_export') != job['id']:
+        if not st.button(f"📦 Prepare {label}", key=f"prepare_export_{job['id']}"):
+            return
+        st.session_state['prepared_export'] = job['id']
+    st.download_button(
+        label=f"⬇️ Download {label}",
+        data=read_export(job),
+        file_name=file_name,
+        mime=EXPORT_FORMATS[job['format']]['mime'],
+        key=f"export_download_{job['id']}",
+        on_click=lambda: st.session_state.pop('prepared_export', None)
+    )
+
 
 st.title("📊 Analytics Dashboard")
 
-# Get statistics
+# Get statistics (small aggregates computed in SQL)
 stats = st.session_state.db.get_statistics()
-projects = st.session_state.db.get_projects()
-
-# Filter out deleted projects
-if 'deleted' in projects.columns:
-    projects = projects[projects['deleted'] == 0]
 
 # KPIs
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("Total Projects", len(projects))
+    st.metric("Total Projects", stats['total'])
 
 with col2:
-    if 'deleted' in stats['by_status'].columns:
-        pending = stats['by_status'][
-            (stats['by_status']['status'] == 'Submitted') & 
-            (stats['by_status'].get('deleted', 0) == 0)
-        ]['count'].sum() if 'Submitted' in stats['by_status']['status'].values else 0
-    else:
-        pending = stats['by_status'][stats['by_status']['status'] == 'Submitted']['count'].sum() if 'Submitted' in stats['by_status']['status'].values else 0
+    pending = stats['by_status'][stats['by_status']['status'] == 'Submitted']['count'].sum() if 'Submitted' in stats['by_status']['status'].values else 0
     st.metric("Pending Review", pending)
 
 with col3:
-    if len(projects) > 0:
-        avg_score = projects['total_score'].mean()
-        st.metric("Avg Score", f"{avg_score:.1f}")
+    if stats['avg_score'] is not None:
+        st.metric("Avg Score", f"{stats['avg_score']:.1f}")
     else:
         st.metric("Avg Score", "N/A")
 
@@ -61,13 +74,8 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown("### Projects by Status")
     if not stats['by_status'].empty:
-        # Filter out deleted from chart
-        status_data = stats['by_status']
-        if 'deleted' in status_data.columns:
-            status_data = status_data[status_data['deleted'] == 0]
-        
         fig = px.pie(
-            status_data, 
+            stats['by_status'], 
             values='count', 
             names='status',
             color_discrete_sequence=px.colors.qualitative.Set3,
@@ -132,27 +140,30 @@ with col1:
 
 with col2:
     st.markdown("### Score Distribution")
-    if len(projects) > 0:
-        fig = px.histogram(
-            projects, 
-            x='total_score', 
-            nbins=20,
-            labels={'total_score': 'Score'},
+    histogram = st.session_state.db.get_score_histogram(bins=20)
+    if histogram['count'].sum() > 0:
+        fig = px.bar(
+            histogram,
+            x=(histogram['bin_start'] + histogram['bin_end']) / 2,
+            y='count',
+            labels={'x': 'Score'},
             color_discrete_sequence=['#636EFA']
         )
-        # Add threshold lines
+        fig.update_traces(width=histogram['bin_end'] - histogram['bin_start'])
+        # Add threshold lines from the active rubric
+        rubric = st.session_state.db.get_rubric()
         fig.add_vline(
-            x=70, 
+            x=rubric.immediate_threshold, 
             line_dash="dash", 
             line_color="red",
-            annotation_text="Immediate (70)",
+            annotation_text=f"Immediate ({rubric.immediate_threshold:g})",
             annotation_position="top"
         )
         fig.add_vline(
-            x=50, 
+            x=rubric.planned_threshold, 
             line_dash="dash", 
             line_color="orange",
-            annotation_text="Planned (50)",
+            annotation_text=f"Planned ({rubric.planned_threshold:g})",
             annotation_position="top"
         )
         fig.update_layout(
@@ -191,14 +202,15 @@ else:
 # Timeline view
 st.markdown("---")
 st.markdown("### 📅 Submission Timeline")
-if len(projects) > 0 and 'submission_date' in projects.columns:
+if stats['total'] > 0:
     try:
-        projects_timeline = projects.copy()
-        projects_timeline['submission_date'] = pd.to_datetime(projects_timeline['submission_date'])
-        timeline_data = projects_timeline.groupby(
-            projects_timeline['submission_date'].dt.date
-        ).size().reset_index()
-        timeline_data.columns = ['date', 'count']
+        timeline_period = st.radio(
+            "Group by",
+            ["day", "week", "month"],
+            format_func=lambda p: {"day": "Daily", "week": "Weekly", "month": "Monthly"}[p],
+            horizontal=True
+        )
+        timeline_data = st.session_state.db.get_submission_counts(timeline_period).rename(columns={'period': 'date'})
         
         fig = px.line(
             timeline_data, 
@@ -226,126 +238,40 @@ else:
 st.markdown("---")
 st.markdown("### 📥 Export Data")
 
-if len(projects) > 0:
+if stats['total'] > 0:
+    st.caption("Exports are built in the background - keep working and download them here when they are ready.")
+    export_jobs = st.session_state.setdefault('export_jobs', [])
     col1, col2 = st.columns(2)
     
     with col1:
         # CSV Export
-        csv = projects.to_csv(index=False)
-        st.download_button(
-            label="📄 Download as CSV",
-            data=csv,
-            file_name=f"project_data_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
+        if st.button("📄 Export as CSV", use_container_width=True):
+            export_jobs.append(submit_export(st.session_state.db, 'csv', st.session_state.user['username']))
     
     with col2:
-        # Excel Export with openpyxl
-        try:
-            from io import BytesIO
-            from openpyxl.styles import Font, PatternFill, Alignment
-            
-            excel_buffer = BytesIO()
-            
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                # Sheet 1: All Projects
-                projects.to_excel(writer, index=False, sheet_name='All Projects')
-                
-                # Sheet 2: Summary Statistics
-                summary_data = {
-                    'Metric': [
-                        'Total Projects',
-                        'Submitted',
-                        'Under Review',
-                        'Approved',
-                        'Rejected',
-                        'High Priority (Immediate)',
-                        'Medium Priority (Planned)',
-                        'Low Priority (Defer)',
-                        'Average Score'
-                    ],
-                    'Count': [
-                        len(projects),
-                        len(projects[projects['status'] == 'Submitted']) if 'Submitted' in projects['status'].values else 0,
-                        len(projects[projects['status'] == 'Under Review']) if 'Under Review' in projects['status'].values else 0,
-                        len(projects[projects['status'] == 'Approved']) if 'Approved' in projects['status'].values else 0,
-                        len(projects[projects['status'] == 'Rejected']) if 'Rejected' in projects['status'].values else 0,
-                        len(projects[projects['priority'] == '🔴 IMMEDIATE']) if '🔴 IMMEDIATE' in projects['priority'].values else 0,
-                        len(projects[projects['priority'] == '🟡 PLANNED']) if '🟡 PLANNED' in projects['priority'].values else 0,
-                        len(projects[projects['priority'] == '⚪ DEFER']) if '⚪ DEFER' in projects['priority'].values else 0,
-                        f"{projects['total_score'].mean():.1f}" if len(projects) > 0 else "N/A"
-                    ]
-                }
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, index=False, sheet_name='Summary')
-                
-                # Format All Projects sheet
-                workbook = writer.book
-                worksheet = writer.sheets['All Projects']
-                
-                # Header formatting
-                header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                header_font = Font(bold=True, color="FFFFFF")
-                
-                for cell in worksheet[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = Alignment(horizontal='center')
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-                
-                # Add filters
-                worksheet.auto_filter.ref = worksheet.dimensions
-                
-                # Format Summary sheet
-                summary_sheet = writer.sheets['Summary']
-                for cell in summary_sheet[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
-                    cell.alignment = Alignment(horizontal='center')
-                
-                for column in summary_sheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 30)
-                    summary_sheet.column_dimensions[column_letter].width = adjusted_width
-            
-            excel_data = excel_buffer.getvalue()
-            
-            st.download_button(
-                label="📊 Download as Excel",
-                data=excel_data,
-                file_name=f"project_data_{pd.Timestamp.now().strftime('%Y%m%d')}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
-        except ImportError:
-            st.info("Excel export requires openpyxl. Add to requirements.txt: openpyxl==3.1.2")
-        except Exception as e:
-            st.error(f"Excel export error: {str(e)}")
+        # Excel Export (openpyxl write-only, streamed in chunks)
+        if st.button("📊 Export as Excel", use_container_width=True):
+            export_jobs.append(submit_export(st.session_state.db, 'xlsx', st.session_state.user['username']))
+    
+    # This session's exports, newest first
+    jobs = st.session_state.db.get_export_jobs(sorted(set(export_jobs)))[:5]
+    for job in jobs:
+        label = f"{EXPORT_FORMATS[job['format']]['extension'].upper()} export #{job['id']} ({job['requested_date']})"
+        if job['status'] == 'completed':
+            export_download(job, label, export_file_name(job['format']))
+        elif job['status'] == 'failed':
+            st.error(f"{label} failed: {job['error']}")
+        else:
+            st.progress(job_progress(job), text=f"{label}: {job['status']}")
+    
+    if any(job['status'] in ('queued', 'running') for job in jobs):
+        if st.button("🔄 Refresh export status"):
+            st.rerun()
 else:
     st.info("No data available to export")
 
 # Additional insights
-if len(projects) > 0:
+if stats['total'] > 0:
     st.markdown("---")
     st.markdown("### 📈 Additional Insights")
     
@@ -353,14 +279,8 @@ if len(projects) > 0:
     
     with col1:
         # Approval rate
-        if 'Approved' in projects['status'].values:
-            approved_count = len(projects[projects['status'] == 'Approved'])
-            total_reviewed = len(projects[projects['status'].isin(['Approved', 'Rejected'])])
-            if total_reviewed > 0:
-                approval_rate = (approved_count / total_reviewed) * 100
-                st.metric("Approval Rate", f"{approval_rate:.1f}%")
-            else:
-                st.metric("Approval Rate", "N/A")
+        if stats['approval_rate'] is not None:
+            st.metric("Approval Rate", f"{stats['approval_rate']:.1f}%")
         else:
             st.metric("Approval Rate", "N/A")
     
@@ -370,9 +290,8 @@ if len(projects) > 0:
     
     with col3:
         # Top requesting department
-        if not projects.empty:
-            top_dept = projects['department'].mode()[0] if len(projects['department'].mode()) > 0 else "N/A"
-            dept_count = len(projects[projects['department'] == top_dept])
+        if stats['top_department'] is not None:
+            top_dept, dept_count = stats['top_department']
             st.metric("Top Department", f"{top_dept} ({dept_count})")
         else:
             st.metric("Top Department", "N/A")
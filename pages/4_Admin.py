@@ -1,6 +1,12 @@
 import streamlit as st
-from utils.database import Database
+from utils.database import get_database
+from utils.exports import EXPORT_FORMATS, export_available, export_file_name, job_progress, read_export, submit_export
+from utils.rubric import SECTIONS
+from utils.simulation import generate_weight_candidates, simulate_weights
 import pandas as pd
+import plotly.express as px
+import json
+import time
 
 st.set_page_config(page_title="Admin", page_icon="⚙️", layout="wide")
 
@@ -13,7 +19,31 @@ if st.session_state.user['role'] != 'compliance_officer':
     st.stop()
 
 if 'db' not in st.session_state:
-    st.session_state.db = Database()
+    st.session_state.db = get_database()
+
+
+def export_download(job, label, file_name):
+    """Download button for a finished export job.
+    
+    The file is read only after "Prepare" is clicked, for one job at a
+    time, so reruns do not load finished exports into memory.
+    """
+    if not export_available(job):
+        st.info(f"{label} has expired - start a new export")
+        return
+    if st.session_state.get('prepared_export') != job['id']:
+        if not st.button(f"📦 Prepare {label}", key=f"prepare_export_{job['id']}"):
+            return
+        st.session_state['prepared_export'] = job['id']
+    st.download_button(
+        label=f"⬇️ Download {label}",
+        data=read_export(job),
+        file_name=file_name,
+        mime=EXPORT_FORMATS[job['format']]['mime'],
+        key=f"export_download_{job['id']}",
+        on_click=lambda: st.session_state.pop('prepared_export', None)
+    )
+
 
 st.title("⚙️ System Administration")
 
@@ -83,7 +113,9 @@ with tab1:
 with tab2:
     st.markdown("### ⚙️ Scoring Configuration")
     
-    st.markdown("#### Current Scoring Weights")
+    rubric = st.session_state.db.get_rubric()
+    
+    st.markdown(f"#### Current Scoring Weights (rubric version {rubric.version})")
     
     weights_data = {
         'Criterion': [
@@ -95,7 +127,7 @@ with tab2:
             '6. Data Sensitivity',
             '7. Stakeholder Pressure'
         ],
-        'Weight': ['25%', '20%', '15%', '15%', '10%', '10%', '5%'],
+        'Weight': [f"{rubric.weights[s] * 100:.0f}%" for s in SECTIONS],
         'Description': [
             'Compliance deadlines, enforcement',
             'Stakeholder harm, liability exposure',
@@ -113,7 +145,11 @@ with tab2:
     
     thresholds_data = {
         'Priority Level': ['🔴 IMMEDIATE', '🟡 PLANNED', '⚪ DEFER'],
-        'Score Range': ['≥ 70 points', '50-69 points', '< 50 points'],
+        'Score Range': [
+            f"≥ {rubric.immediate_threshold:g} points",
+            f"≥ {rubric.planned_threshold:g} and < {rubric.immediate_threshold:g} points",
+            f"< {rubric.planned_threshold:g} points"
+        ],
         'Expected Action': [
             'Fast-track approval, assign resources within 5 business days',
             'Add to quarterly plan, assign within 30 days',
@@ -123,14 +159,154 @@ with tab2:
     thresholds_df = pd.DataFrame(thresholds_data)
     st.dataframe(thresholds_df, use_container_width=True, hide_index=True)
     
-    st.warning("""
-    ⚠️ **To modify weights or thresholds:**
-    - Edit `utils/scoring.py` → `calculate_total_score()` function
-    - Edit `utils/scoring.py` → `get_priority()` function
-    - Changes require code deployment
-    - Test thoroughly before production changes
+    # What-if mode
+    with st.expander("🧪 What-if: Weight Sensitivity Simulator", expanded=False):
+        st.markdown("""
+        Evaluates many candidate weight vectors around the current weights against the stored
+        section scores (including overrides) of every project, without changing anything.
+        """)
+        
+        with st.form("what_if_form"):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                n_candidates = st.number_input("Candidate weight vectors", min_value=10, max_value=20000,
+                                               value=1000, step=100)
+            with col2:
+                concentration = st.slider("Closeness to current weights", min_value=5, max_value=500, value=50,
+                                          help="Higher values keep candidates closer to the current weights")
+            with col3:
+                top_k = st.number_input("Candidates to analyse in detail", min_value=1, max_value=100, value=10)
+            
+            run_simulation = st.form_submit_button("▶️ Run Simulation")
+        
+        if run_simulation:
+            section_scores = st.session_state.db.get_section_scores()
+            if section_scores.empty:
+                st.info("No projects to simulate against yet")
+            else:
+                started = time.perf_counter()
+                candidates = generate_weight_candidates(rubric.weights, int(n_candidates), concentration)
+                summary, department_impact = simulate_weights(
+                    section_scores[list(SECTIONS)].fillna(0).to_numpy(),
+                    section_scores['department'],
+                    candidates,
+                    rubric.weights,
+                    rubric.immediate_threshold,
+                    rubric.planned_threshold,
+                    top_k=int(top_k)
+                )
+                st.session_state['what_if'] = {
+                    'summary': summary,
+                    'department_impact': department_impact,
+                    'projects': len(section_scores),
+                    'seconds': time.perf_counter() - started
+                }
+        
+        what_if = st.session_state.get('what_if')
+        if what_if:
+            summary = what_if['summary']
+            st.caption(f"{len(summary):,} weight vectors × {what_if['projects']:,} projects "
+                       f"evaluated in {what_if['seconds']:.2f}s")
+            
+            top = summary.dropna(subset=['rank_correlation']).copy()
+            for section in SECTIONS:
+                top[section] = (top[section] * 100).round(1)
+            st.markdown("**Most disruptive candidates** (weights in %)")
+            st.dataframe(
+                top,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "band_changes": st.column_config.NumberColumn("Band Changes"),
+                    "moved_up": st.column_config.NumberColumn("↑ Up"),
+                    "moved_down": st.column_config.NumberColumn("↓ Down"),
+                    "mean_shift": st.column_config.NumberColumn("Mean Score Shift", format="%.2f"),
+                    "rank_correlation": st.column_config.NumberColumn("Rank Correlation", format="%.3f")
+                }
+            )
+            
+            inspect = st.selectbox("Department impact for candidate", top['candidate'].tolist())
+            impact = what_if['department_impact']
+            impact = impact[impact['candidate'] == inspect].sort_values('mean_score_change')
+            fig = px.bar(
+                impact,
+                x='department',
+                y='mean_score_change',
+                color='net_band_moves',
+                color_continuous_scale='RdYlGn',
+                labels={'mean_score_change': 'Mean Score Change', 'net_band_moves': 'Net Band Moves'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+    
+    st.info("""
+    ℹ️ **Weights and thresholds are stored as versioned rubrics in the database.**
+    - Saving creates a new rubric version; earlier versions are kept
+    - New submissions and reviews use the latest version immediately, no deployment needed
+    - Every stored score records the rubric version it was calculated with
     """)
     
+    # New rubric version
+    with st.expander("✏️ Create New Rubric Version", expanded=False):
+        with st.form("rubric_form"):
+            st.markdown("**Weights (%)** - must add up to 100")
+            criterion_labels = weights_data['Criterion']
+            weight_cols = st.columns(4)
+            new_weights = {}
+            for i, section in enumerate(SECTIONS):
+                with weight_cols[i % 4]:
+                    new_weights[section] = st.number_input(
+                        criterion_labels[i],
+                        min_value=0,
+                        max_value=100,
+                        value=int(round(rubric.weights[section] * 100)),
+                        step=5,
+                        key=f"rubric_weight_{section}"
+                    )
+            
+            st.markdown("**Priority Thresholds**")
+            col1, col2 = st.columns(2)
+            with col1:
+                new_immediate = st.number_input("IMMEDIATE at or above", min_value=0.0, max_value=100.0,
+                                                value=float(rubric.immediate_threshold), step=1.0)
+            with col2:
+                new_planned = st.number_input("PLANNED at or above", min_value=0.0, max_value=100.0,
+                                              value=float(rubric.planned_threshold), step=1.0)
+            
+            definition = rubric.to_definition()
+            option_maps_text = st.text_area(
+                "Option points (JSON, advanced)",
+                value=json.dumps(definition['option_maps'], indent=2, ensure_ascii=False),
+                height=250,
+                help="Points awarded for each answer option; 'default' applies to unlisted answers"
+            )
+            
+            rubric_notes = st.text_input("Reason for change *",
+                placeholder="Example: Quarterly calibration - increase Strategic weight")
+            
+            submit_rubric = st.form_submit_button("💾 Save as New Version", type="primary")
+            
+            if submit_rubric:
+                if not rubric_notes or len(rubric_notes) < 10:
+                    st.error("❌ Please describe the reason for the change (minimum 10 characters)")
+                else:
+                    try:
+                        version = st.session_state.db.save_rubric(
+                            {s: w / 100 for s, w in new_weights.items()},
+                            {'IMMEDIATE': new_immediate, 'PLANNED': new_planned},
+                            json.loads(option_maps_text),
+                            st.session_state.user['username'],
+                            rubric_notes
+                        )
+                        st.success(f"✅ Rubric version {version} saved and active")
+                        st.rerun()
+                    except json.JSONDecodeError as e:
+                        st.error(f"❌ Option points are not valid JSON: {str(e)}")
+                    except ValueError as e:
+                        st.error(f"❌ {str(e)}")
+    
+    with st.expander("🕒 Rubric History"):
+        st.dataframe(st.session_state.db.get_rubric_history(), use_container_width=True, hide_index=True)
+    
     # Calibration notes
     with st.expander("📊 Calibration Guidance"):
         st.markdown("""
@@ -156,10 +332,51 @@ with tab2:
         - "Everything scores 60-70" → Adjust thresholds: IMMEDIATE >75, PLANNED 55-75
         
         **Best practice:**
-        - Document all changes in git commit messages
+        - Document the reason for every new rubric version
         - Notify stakeholders before changes
         - Re-score existing pending projects after weight changes
         """)
+    
+    # Bulk re-score
+    st.markdown("#### 🔁 Re-score Pending Projects")
+    st.caption("Recalculates section scores, total and priority of all 'Submitted' projects with a rubric version. "
+               "Projects already under review keep their compliance officer scores.")
+    
+    last_job = st.session_state.db.get_rescore_job()
+    resume_job = last_job if last_job and last_job['status'] != 'completed' else None
+    
+    if last_job and last_job['status'] == 'completed':
+        st.info(f"Last run: job #{last_job['id']} (rubric v{last_job['rubric_version']}) finished "
+                f"{last_job['finished_date']} - {last_job['processed']} checked, {last_job['changed']} updated")
+    elif resume_job:
+        st.warning(f"⚠️ Job #{resume_job['id']} (rubric v{resume_job['rubric_version']}) stopped at "
+                   f"{resume_job['processed']} / {resume_job['total']} projects"
+                   + (f": {resume_job['error']}" if resume_job.get('error') else ""))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        start_rescore = st.button(f"🔁 Re-score with rubric v{rubric.version}", use_container_width=True)
+    with col2:
+        resume_rescore = st.button("▶️ Resume Stopped Job", use_container_width=True, disabled=resume_job is None)
+    
+    if start_rescore or resume_rescore:
+        if resume_rescore:
+            job_id = resume_job['id']
+        else:
+            job_id = st.session_state.db.start_rescore_job(rubric.version, st.session_state.user['username'])
+        
+        progress_bar = st.progress(0.0, text="Starting re-score...")
+        
+        def report_progress(processed, total):
+            progress_bar.progress(min(processed / total, 1.0) if total else 1.0,
+                                  text=f"Re-scored {processed:,} / {total:,} projects")
+        
+        try:
+            job = st.session_state.db.run_rescore_job(job_id, progress_callback=report_progress)
+            progress_bar.progress(1.0, text="Done")
+            st.success(f"✅ Job #{job['id']} complete: {job['processed']} projects checked, {job['changed']} updated")
+        except Exception as e:
+            st.error(f"❌ Re-score stopped: {str(e)} - use Resume to continue from the last checkpoint")
 
 with tab3:
     st.markdown("### 🗄️ Database Management")
@@ -169,24 +386,14 @@ with tab3:
     with col1:
         st.markdown("#### Database Statistics")
         
-        projects = st.session_state.db.get_projects()
-        
-        # Active projects
-        if 'deleted' in projects.columns:
-            active_projects = projects[projects['deleted'] == 0]
-            deleted_count = len(projects[projects['deleted'] == 1])
-        else:
-            active_projects = projects
-            deleted_count = 0
+        db_stats = st.session_state.db.get_statistics()
         
-        st.metric("Active Projects", len(active_projects))
-        st.metric("Deleted Projects (Archive)", deleted_count)
+        st.metric("Active Projects", db_stats['total'])
+        st.metric("Deleted Projects (Archive)", db_stats['deleted'])
         
         # Status breakdown
-        if len(active_projects) > 0:
-            status_counts = active_projects['status'].value_counts()
-            for status, count in status_counts.items():
-                st.metric(f"Status: {status}", count)
+        for _, row in db_stats['by_status'].iterrows():
+            st.metric(f"Status: {row['status']}", int(row['count']))
         
         if st.button("🔄 Refresh Statistics"):
             st.rerun()
@@ -200,6 +407,12 @@ with tab3:
         if st.button("🗑️ View Deleted Projects Archive", use_container_width=True):
             st.session_state['show_deleted'] = True
         
+        # Re-apply red flag rules to existing projects
+        if st.button("🚩 Re-evaluate Red Flags", use_container_width=True,
+                     help="Apply the current red flag rules to every project, e.g. after a rule was added"):
+            updated = st.session_state.db.refresh_red_flags(st.session_state.user['username'])
+            st.success(f"✅ Red flags re-evaluated - {updated} projects updated")
+        
         # Database info
         with st.expander("💾 Database Information"):
             st.markdown("""
@@ -207,16 +420,17 @@ with tab3:
             - **Database:** SQLite (local file)
             - **Location:** `/home/claude/project_scoring.db`
             - **Persistence:** Ephemeral (resets on restart)
+            - **Connections:** Pooled per process, WAL journal mode (readers don't block the writer)
+            - **Query cache:** Shared across sessions, refreshed after every write
             
             **For Production:**
             - Migrate to PostgreSQL or MySQL
             - Set up regular backups
-            - Implement connection pooling
             - Enable audit logging
             
             **Current Limitations:**
             - Data lost on app restart (Streamlit Cloud)
-            - Single concurrent connection
+            - Single writer at a time (concurrent writes wait up to 5 seconds)
             - No automated backups
             """)
     
@@ -272,7 +486,7 @@ with tab3:
                 st.markdown("<br>", unsafe_allow_html=True)  # Spacing
                 if st.button("♻️ Restore", type="primary", use_container_width=True):
                     try:
-                        st.session_state.db.restore_project(restore_id)
+                        st.session_state.db.restore_project(restore_id, st.session_state.user['username'])
                         st.success(f"✅ Project #{restore_id} has been restored to active queue")
                         import time
                         time.sleep(2)
@@ -291,19 +505,79 @@ with tab3:
     # Raw database view (for debugging)
     if not st.session_state.get('show_deleted', False):
         with st.expander("📋 View Raw Database (Active Projects)", expanded=False):
+            active_projects = st.session_state.db.get_projects()
             if len(active_projects) > 0:
                 st.dataframe(active_projects, use_container_width=True)
                 
-                # Download raw data
-                csv_raw = active_projects.to_csv(index=False)
-                st.download_button(
-                    label="⬇️ Download Raw Data (CSV)",
-                    data=csv_raw,
-                    file_name=f"raw_projects_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
+                # Download raw data (built in the background)
+                if st.button("📦 Export Raw Data (CSV)"):
+                    st.session_state['raw_export_job'] = submit_export(
+                        st.session_state.db, 'csv', st.session_state.user['username']
+                    )
+                
+                raw_job_id = st.session_state.get('raw_export_job')
+                raw_job = st.session_state.db.get_export_job(raw_job_id) if raw_job_id else None
+                if raw_job is not None:
+                    if raw_job['status'] == 'completed':
+                        export_download(raw_job, "Raw Data (CSV)", export_file_name('csv', prefix='raw_projects'))
+                    elif raw_job['status'] == 'failed':
+                        st.error(f"Export failed: {raw_job['error']}")
+                    else:
+                        st.progress(job_progress(raw_job), text=f"Export #{raw_job['id']}: {raw_job['status']}")
+                        if st.button("🔄 Refresh export status"):
+                            st.rerun()
             else:
                 st.info("No active projects in database")
+        
+        # Columnar snapshots for BI / downstream jobs
+        with st.expander("🧊 Columnar Snapshots (Parquet / Arrow)", expanded=False):
+            st.caption(
+                "Typed snapshot of the projects table with categorical columns. "
+                "Incremental snapshots contain only rows changed since the last completed one "
+                "(including deletions), identified by the change_seq watermark."
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                snapshot_format = st.radio(
+                    "Format", ['parquet', 'arrow'],
+                    format_func=lambda f: {'parquet': 'Parquet', 'arrow': 'Arrow IPC'}[f],
+                    horizontal=True
+                )
+            last_snapshot = st.session_state.db.get_last_export_job(snapshot_format)
+            with col2:
+                incremental = st.checkbox(
+                    "Incremental since last snapshot",
+                    disabled=last_snapshot is None or last_snapshot['through_seq'] is None,
+                    help="Requires a completed snapshot in the same format"
+                )
+            if last_snapshot is not None:
+                st.caption(f"Last snapshot: #{last_snapshot['id']} on {last_snapshot['finished_date']} "
+                           f"(through change {last_snapshot['through_seq']})")
+            
+            if st.button("📦 Create Snapshot"):
+                try:
+                    st.session_state['snapshot_job'] = submit_export(
+                        st.session_state.db, snapshot_format, st.session_state.user['username'],
+                        since_seq=last_snapshot['through_seq'] if incremental else None
+                    )
+                except ImportError:
+                    st.error("Snapshots need pyarrow - install it with `pip install pyarrow`")
+            
+            snapshot_job_id = st.session_state.get('snapshot_job')
+            snapshot_job = st.session_state.db.get_export_job(snapshot_job_id) if snapshot_job_id else None
+            if snapshot_job is not None:
+                if snapshot_job['status'] == 'completed':
+                    if export_available(snapshot_job):
+                        st.caption(f"{snapshot_job['processed']:,} rows written to `{snapshot_job['file_path']}`")
+                    export_download(snapshot_job, "Snapshot",
+                                    export_file_name(snapshot_job['format'], prefix='projects_snapshot'))
+                elif snapshot_job['status'] == 'failed':
+                    st.error(f"Snapshot failed: {snapshot_job['error']}")
+                else:
+                    st.progress(job_progress(snapshot_job), text=f"Snapshot #{snapshot_job['id']}: {snapshot_job['status']}")
+                    if st.button("🔄 Refresh snapshot status"):
+                        st.rerun()
 
 with tab4:
     st.markdown("### 📋 Audit Log")
@@ -317,137 +591,97 @@ with tab4:
     - Project restorations
     """)
     
-    # Get recent activity
-    projects = st.session_state.db.get_projects()
+    # Filters (applied in SQL)
+    action_options, user_options = st.session_state.db.get_audit_filter_options()
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        action_filter = st.multiselect("Action Type", action_options)
+    
+    with col2:
+        user_filter = st.multiselect("User", user_options)
+    
+    with col3:
+        date_range = st.date_input(
+            "Date Range",
+            value=[]
+        )
+    
+    audit_filters = {
+        'actions': action_filter,
+        'users': user_filter,
+        'start_date': date_range[0] if len(date_range) == 2 else None,
+        'end_date': date_range[1] if len(date_range) == 2 else None
+    }
+    
+    # Keyset pagination: one key per page already visited, reset when filters change
+    filter_key = repr(sorted((k, str(v)) for k, v in audit_filters.items()))
+    if st.session_state.get('audit_filter_key') != filter_key:
+        st.session_state['audit_filter_key'] = filter_key
+        st.session_state['audit_page_keys'] = [None]
+        st.session_state.pop('audit_export', None)
+    page_keys = st.session_state['audit_page_keys']
+    
+    page_size = 50
+    total_events = st.session_state.db.count_audit_events(**audit_filters)
+    audit_df = st.session_state.db.get_audit_events(**audit_filters, after=page_keys[-1], limit=page_size)
     
-    if len(projects) > 0:
+    if total_events > 0:
         st.markdown("#### Recent Activity")
+        st.markdown(f"**Filtered Results:** {total_events} activities "
+                    f"(page {len(page_keys)} of {-(-total_events // page_size)})")
         
-        # Create activity log from existing data
-        activity_log = []
-        
-        for _, project in projects.iterrows():
-            # Submission
-            activity_log.append({
-                'Date': project['submission_date'],
-                'Action': 'Project Submitted',
-                'User': project['requestor_name'],
-                'Project': f"#{project['id']} - {project['project_title']}",
-                'Details': f"Department: {project['department']}"
-            })
-            
-            # Review
-            if project.get('co_reviewed_by') and project.get('co_reviewed_date'):
-                activity_log.append({
-                    'Date': project['co_reviewed_date'],
-                    'Action': 'Project Reviewed',
-                    'User': project['co_reviewed_by'],
-                    'Project': f"#{project['id']} - {project['project_title']}",
-                    'Details': f"Decision: {project.get('co_decision', 'N/A')}"
-                })
-            
-            # Override
-            if project.get('co_override_reg') or project.get('co_override_rep'):
-                activity_log.append({
-                    'Date': project.get('co_reviewed_date', 'N/A'),
-                    'Action': 'Scores Overridden',
-                    'User': project.get('co_reviewed_by', 'N/A'),
-                    'Project': f"#{project['id']} - {project['project_title']}",
-                    'Details': 'Compliance officer adjusted scoring'
-                })
-            
-            # Deletion
-            if project.get('deleted') == 1 and project.get('deleted_date'):
-                activity_log.append({
-                    'Date': project['deleted_date'],
-                    'Action': 'Project Deleted',
-                    'User': project.get('deleted_by', 'Unknown'),
-                    'Project': f"#{project['id']} - {project['project_title']}",
-                    'Details': f"Reason: {project.get('deletion_reason', 'N/A')}"
-                })
-        
-        # Convert to dataframe and sort
-        if activity_log:
-            audit_df = pd.DataFrame(activity_log)
-            audit_df['Date'] = pd.to_datetime(audit_df['Date'], errors='coerce')
-            audit_df = audit_df.sort_values('Date', ascending=False)
-            
-            # Display recent 50 activities
-            st.dataframe(
-                audit_df.head(50),
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Date": st.column_config.DatetimeColumn("Timestamp", format="DD/MM/YYYY HH:mm:ss")
-                }
+        audit_display = pd.DataFrame({
+            'Date': pd.to_datetime(audit_df['event_date'], errors='coerce'),
+            'Action': audit_df['action'],
+            'User': audit_df['username'],
+            'Project': [
+                f"#{int(pid)} - {title}" if pd.notna(pid) else ""
+                for pid, title in zip(audit_df['project_id'], audit_df['project_title'])
+            ],
+            'Details': audit_df['details'],
+            'Changes': audit_df['changes']
+        })
+        
+        st.dataframe(
+            audit_display,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Date": st.column_config.DatetimeColumn("Timestamp", format="DD/MM/YYYY HH:mm:ss")
+            }
+        )
+        
+        col1, col2, col3 = st.columns([1, 1, 2])
+        
+        with col1:
+            if st.button("⬅️ Newer", use_container_width=True, disabled=len(page_keys) == 1):
+                page_keys.pop()
+                st.rerun()
+        
+        with col2:
+            next_key = st.session_state.db.next_page_key(audit_df, 'event_date')
+            if st.button("Older ➡️", use_container_width=True, disabled=len(audit_df) < page_size):
+                page_keys.append(next_key)
+                st.rerun()
+        
+        # Export audit log (all filtered events, built on request)
+        st.markdown("---")
+        if st.button("📥 Prepare Audit Log Export"):
+            export_df = st.session_state.db.get_audit_events(**audit_filters, limit=None)
+            st.session_state['audit_export'] = export_df.to_csv(index=False)
+        
+        if st.session_state.get('audit_export'):
+            st.download_button(
+                label="⬇️ Download Audit Log (CSV)",
+                data=st.session_state['audit_export'],
+                file_name=f"audit_log_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv"
             )
-            
-            # Export audit log
-            st.markdown("---")
-            col1, col2, col3 = st.columns([1, 1, 2])
-            
-            with col1:
-                csv_audit = audit_df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Audit Log (CSV)",
-                    data=csv_audit,
-                    file_name=f"audit_log_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
-            
-            with col2:
-                # Filter options
-                if st.button("🔍 Advanced Filters", use_container_width=True):
-                    st.session_state['show_audit_filters'] = not st.session_state.get('show_audit_filters', False)
-            
-            # Advanced filters
-            if st.session_state.get('show_audit_filters', False):
-                st.markdown("---")
-                st.markdown("#### Filter Audit Log")
-                
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    action_filter = st.multiselect(
-                        "Action Type",
-                        audit_df['Action'].unique().tolist()
-                    )
-                
-                with col2:
-                    user_filter = st.multiselect(
-                        "User",
-                        audit_df['User'].unique().tolist()
-                    )
-                
-                with col3:
-                    date_range = st.date_input(
-                        "Date Range",
-                        value=[]
-                    )
-                
-                # Apply filters
-                filtered_df = audit_df.copy()
-                
-                if action_filter:
-                    filtered_df = filtered_df[filtered_df['Action'].isin(action_filter)]
-                
-                if user_filter:
-                    filtered_df = filtered_df[filtered_df['User'].isin(user_filter)]
-                
-                if len(date_range) == 2:
-                    start_date, end_date = date_range
-                    filtered_df = filtered_df[
-                        (filtered_df['Date'].dt.date >= start_date) & 
-                        (filtered_df['Date'].dt.date <= end_date)
-                    ]
-                
-                st.markdown(f"**Filtered Results:** {len(filtered_df)} activities")
-                st.dataframe(filtered_df, use_container_width=True, hide_index=True)
-        else:
-            st.info("No audit activity recorded yet")
     else:
-        st.info("No projects in system yet - audit log will appear after first submission")
-    
+        st.info("No audit activity recorded yet" if not any([action_filter, user_filter, len(date_range) == 2])
+                else "No audit activity matches the selected filters")
     # Audit configuration
     with st.expander("⚙️ Audit Configuration"):
         st.markdown("""
@@ -456,12 +690,12 @@ with tab4:
         - ✅ Reviews and decisions logged
         - ✅ Score overrides logged
         - ✅ Deletions logged
+        - ✅ System changes logged (rubric versions, bulk re-scores, red flag refreshes)
+        - ✅ Append-only storage (events cannot be edited or removed)
         - ❌ Login attempts (not implemented)
         - ❌ Failed actions (not implemented)
-        - ❌ System changes (not implemented)
         
         **For Production:**
-        - Implement comprehensive audit trail
         - Log all authentication attempts
         - Track configuration changes
         - Store logs in separate audit database
@@ -1,18 +1,319 @@
 import sqlite3
+import json
+import functools
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 import os
+import queue
+import threading
+
+from utils.enums import ENUMS, decode_answers, encode_answers
+from utils.scoring import (
+    RED_FLAG_COLUMNS, SCORE_COLUMNS, SCORING_INPUTS,
+    calculate_batch_scores, evaluate_red_flags, get_batch_priority, infer_op_blocker
+)
+from utils.rubric import (
+    DEFAULT_THRESHOLDS, DEFAULT_WEIGHTS, ORIGINAL_OPTION_MAPS, PRIORITY_LEVELS, SCORING_RULES, SECTIONS,
+    load_rubric, rubric_json, validate_rubric
+)
+from utils.migrations import (
+    PRIORITY_ORDER, SCORE_ORDER, SEARCH_COLUMNS, ensure_schema, fts_query, rebuild_project_stats
+)
+from utils.scheduler import AT_RISK_HOURS, QUEUE_STATUSES, SLA_ORDER
+from utils.schema import PROJECT_DTYPES, apply_dtypes, read_frame
+
+
+# Applied to every pooled connection. WAL lets readers run alongside a writer,
+# busy_timeout makes a second writer wait instead of failing with "database is locked"
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456"
+)
+
+
+def _json_default(value):
+    """JSON fallback for numpy scalars and other values in audit changes"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class ConcurrencyError(Exception):
+    """A project changed, or is leased by another reviewer, since the caller read it"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived SQLite connections for one database file.
+    
+    Connections are opened lazily, configured once with CONNECTION_PRAGMAS and
+    reused across Streamlit reruns and sessions. When all pooled connections
+    are busy an extra one is opened for the caller and closed afterwards.
+    """
+    
+    def __init__(self, db_name, size=8, cached_statements=256):
+        self.db_name = db_name
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._opened = 0
+        self._lock = threading.Lock()
+    
+    def _open(self):
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_name,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _acquire(self):
+        """Idle connection, a new pooled one, or an overflow connection"""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                return self._open(), True
+        return self._open(), False
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn, pooled = self._acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if pooled:
+                self._idle.put(conn)
+            else:
+                conn.close()
+    
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+class ResultCache:
+    """Bounded LRU of query results, emptied whenever the database file changes.
+    
+    Freshness is checked with PRAGMA data_version on a connection that never
+    writes. Its value changes as soon as any other connection, in this process
+    or another, commits, so a hit costs one PRAGMA and a dict lookup.
+    """
+    
+    def __init__(self, db_name, size=128):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(db_name, check_same_thread=False)
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def get(self, key, compute):
+        """Cached result for key, calling compute() on a miss"""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(self._entries[key])
+            self.misses += 1
+        
+        value = compute()
+        
+        with self._lock:
+            # A commit during compute() bumps the version and clears this entry on the next get
+            if self._version == version:
+                self._entries[key] = value
+                if len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return _copy_result(value)
+    
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+
+def _copy_result(value):
+    """Copy of a cached result that callers can modify freely"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    return value
+
+
+def _freeze(value):
+    """Hashable form of a query argument (lists and dicts become tuples)"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def cached_query(method):
+    """Serve a read-only Database method from its result cache"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, _freeze(args), _freeze(kwargs))
+        return self.cache.get(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+class ProjectCache:
+    """Bounded LRU of single-project dicts for one Streamlit session.
+    
+    Keeps the projects a reviewer has just viewed, plus the next few in the
+    queue (prefetch), so stepping through the queue and rerunning on widget
+    changes does not refetch the row. Entries are kept fresh with the
+    projects change counter: any write to a project - update_project in
+    this session or another, deletes, re-scoring - bumps it, and only the
+    rows changed since the last check are evicted.
+    """
+    
+    def __init__(self, db, size=50):
+        self.db = db
+        self.size = size
+        self._entries = OrderedDict()
+        self._seq = None
+    
+    def _sync(self):
+        """Evict entries for projects changed since the last check"""
+        seq = self.db.get_change_seq()
+        if seq != self._seq:
+            if self._seq is None:
+                self._entries.clear()
+            else:
+                for project_id in self.db.get_changed_project_ids(self._seq):
+                    self._entries.pop(project_id, None)
+            self._seq = seq
+    
+    def _store(self, project_id, project):
+        """Add a project as most recently used, evicting the oldest beyond size"""
+        self._entries[project_id] = project
+        self._entries.move_to_end(project_id)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+    
+    def get(self, project_id):
+        """Project dict (a copy) for an ID, or None if it does not exist"""
+        project_id = int(project_id)
+        self._sync()
+        if project_id in self._entries:
+            self._entries.move_to_end(project_id)
+            return dict(self._entries[project_id])
+        project = self.db.get_project(project_id)
+        if project is not None:
+            self._store(project_id, project)
+            return dict(project)
+        return None
+    
+    def prefetch(self, project_ids):
+        """Load the given projects that are not cached yet in one query"""
+        self._sync()
+        missing = [int(project_id) for project_id in project_ids if int(project_id) not in self._entries]
+        if missing:
+            for project_id, project in self.db.get_projects_by_id(missing).items():
+                # Prefetched rows go behind recently viewed ones in eviction order
+                self._entries[project_id] = project
+                self._entries.move_to_end(project_id, last=False)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, project_id=None):
+        """Drop one project, or everything"""
+        if project_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(int(project_id), None)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name):
+    """Process-wide connection pool for a database file"""
+    key = os.path.abspath(db_name)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_name)
+        return pool
+
+
+# get_projects() sort orders: (SQL expression, direction). Ties are broken by id
+# in the same direction, so (expression, id) is a unique keyset.
+QUEUE_SORTS = {
+    'newest': ('submission_date', 'DESC'),
+    'oldest': ('submission_date', 'ASC'),
+    'score': (SCORE_ORDER, 'DESC'),
+    'priority': (PRIORITY_ORDER, 'ASC'),
+    'due': (SLA_ORDER, 'ASC')
+}
+
+# Review leases: how long a claim lasts (see QUEUE_STATUSES for what can be claimed)
+LEASE_MINUTES = 30
+
+# get_submission_counts(): SQL for the first day of each period, from "YYYY-MM-DD HH:MM:SS" text
+SUBMISSION_PERIODS = {
+    'day': "substr(submission_date, 1, 10)",
+    'week': "date(submission_date, 'weekday 0', '-6 days')",
+    'month': "substr(submission_date, 1, 7) || '-01'"
+}
+
 
 class Database:
-    def __init__(self, db_name="project_scoring.db"):
+    def __init__(self, db_name="project_scoring.db", cache_size=128):
         self.db_name = db_name
+        self.pool = get_pool(db_name)
+        self._project_columns = None
         self.init_db()
+        self.cache = ResultCache(db_name, cache_size)
+    
+    def _connection(self):
+        """Borrow a pooled connection (use as a context manager)"""
+        return self.pool.connection()
     
     def init_db(self):
-        """Initialize database with tables"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
+        """Initialize database with tables (once per process; a no-op when the schema is current)"""
+        with self._connection() as conn:
+            ensure_schema(conn, self.db_name, self._create_tables)
+    
+    @staticmethod
+    def _create_tables(c):
+        """Create the base tables and seed rows; later changes live in utils/migrations.py"""
         # Projects table
         c.execute('''
             CREATE TABLE IF NOT EXISTS projects (
@@ -24,24 +325,25 @@ class Database:
                 submission_date TEXT NOT NULL,
                 status TEXT DEFAULT 'Submitted',
                 
+                -- Option answers are integer codes, labelled in option_labels
                 -- Section 1: Regulatory
-                reg_required TEXT,
+                reg_required INTEGER,
                 reg_citation TEXT,
-                reg_deadline TEXT,
-                reg_enforcement TEXT,
+                reg_deadline INTEGER,
+                reg_enforcement INTEGER,
                 reg_score REAL,
                 
                 -- Section 2: Reputational
                 rep_headline TEXT,
-                rep_risk_level TEXT,
-                rep_harm_categories TEXT,
-                rep_liability TEXT,
+                rep_risk_level INTEGER,
+                rep_harm_categories INTEGER,
+                rep_liability INTEGER,
                 rep_score REAL,
                 
                 -- Section 3: Strategic
-                strat_document TEXT,
-                strat_sponsor TEXT,
-                strat_budget TEXT,
+                strat_document INTEGER,
+                strat_sponsor INTEGER,
+                strat_budget INTEGER,
                 strat_score REAL,
                 
                 -- Section 4: Operational
@@ -49,23 +351,24 @@ class Database:
                 op_current_time REAL,
                 op_projected_time REAL,
                 op_efficiency_gain REAL,
-                op_scope TEXT,
+                op_scope INTEGER,
+                op_blocker INTEGER,
                 op_score REAL,
                 
                 -- Section 5: Resources
-                res_approach TEXT,
+                res_approach INTEGER,
                 res_total_hours REAL,
-                res_external_deps TEXT,
+                res_external_deps INTEGER,
                 res_score REAL,
                 
                 -- Section 6: Data Sensitivity
-                data_type TEXT,
-                data_third_party TEXT,
+                data_type INTEGER,
+                data_third_party INTEGER,
                 data_volume TEXT,
                 data_score REAL,
                 
                 -- Section 7: Stakeholder
-                stake_requestor_level TEXT,
+                stake_requestor_level INTEGER,
                 stake_urgency TEXT,
                 stake_score REAL,
                 
@@ -89,10 +392,54 @@ class Database:
                 
                 -- Red Flags
                 red_flags TEXT,
-                auto_reject INTEGER DEFAULT 0
+                auto_reject INTEGER DEFAULT 0,
+                
+                -- Rubric used for the stored scores
+                rubric_version INTEGER
             )
         ''')
         
+        # Scoring rubrics (append-only, newest version is active)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS scoring_rubrics (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                weights TEXT NOT NULL,
+                thresholds TEXT NOT NULL,
+                option_maps TEXT NOT NULL,
+                created_by TEXT,
+                created_date TEXT NOT NULL,
+                notes TEXT
+            )
+        ''')
+        
+        # Bulk re-score jobs (checkpointed so they can resume)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS rescore_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                rubric_version INTEGER NOT NULL,
+                statuses TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                last_id INTEGER NOT NULL DEFAULT 0,
+                processed INTEGER NOT NULL DEFAULT 0,
+                changed INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                started_by TEXT,
+                started_date TEXT NOT NULL,
+                updated_date TEXT,
+                finished_date TEXT,
+                error TEXT
+            )
+        ''')
+        
+        # Seed version 1 with the original rubric; migration 15 publishes the
+        # current one on top of it
+        c.execute('''
+            INSERT INTO scoring_rubrics (weights, thresholds, option_maps, created_by, created_date, notes)
+            SELECT ?, ?, ?, 'system', ?, 'Initial rubric'
+            WHERE NOT EXISTS (SELECT 1 FROM scoring_rubrics)
+        ''', (*rubric_json(DEFAULT_WEIGHTS, DEFAULT_THRESHOLDS, ORIGINAL_OPTION_MAPS),
+              datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        
         # Users table (simple auth)
         c.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -115,83 +462,446 @@ class Database:
             INSERT OR IGNORE INTO users (username, password, role, email)
             VALUES ('requestor', 'req123', 'requestor', 'requestor@company.com')
         ''')
-        
-        conn.commit()
-        conn.close()
     
-    def submit_project(self, data):
+    def submit_project(self, data, username=None):
         """Submit new project"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        data = encode_answers(data)
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            columns = ', '.join(data.keys())
+            placeholders = ', '.join(['?' for _ in data])
+            
+            c.execute(f'''
+                INSERT INTO projects ({columns})
+                VALUES ({placeholders})
+            ''', list(data.values()))
+            
+            project_id = c.lastrowid
+            self._log_event(c, 'Project Submitted', username or data.get('requestor_name'), project_id,
+                            f"Department: {data.get('department')}")
         
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?' for _ in data])
+        return project_id
+    
+    @cached_query
+    def get_projects(self, status=None, include_deleted=False, columns=None, priority=None,
+                     department=None, min_score=None, max_score=None, start_date=None,
+                     end_date=None, sort='newest', after=None, limit=None):
+        """Get projects in a QUEUE_SORTS order (newest first by default), with all filters applied in SQL.
         
-        c.execute(f'''
-            INSERT INTO projects ({columns})
-            VALUES ({placeholders})
-        ''', list(data.values()))
+        Deleted (archived) projects are left out unless include_deleted is set.
+        columns selects a subset of columns (id and submission_date are always
+        included). status, priority and department take one value or a list.
+        Scores filter total_score; dates filter submission_date, and a plain date
+        as end_date includes that whole day. For keyset pagination pass
+        after=next_page_key(previous_page) together with limit and the same
+        sort; paginated results carry the sort value in a sort_key column.
+        """
+        if sort not in QUEUE_SORTS:
+            raise ValueError(f"Unknown sort '{sort}', expected one of {list(QUEUE_SORTS)}")
+        order, direction = QUEUE_SORTS[sort]
         
-        project_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        conditions, params = self._project_filters(
+            status=status, priority=priority, department=department, include_deleted=include_deleted,
+            min_score=min_score, max_score=max_score, start_date=start_date, end_date=end_date
+        )
+        if after is not None:
+            conditions.append(f"({order}, id) {'<' if direction == 'DESC' else '>'} (?, ?)")
+            params.extend([after[0], int(after[1])])
         
-        return project_id
+        select = self._select_list(columns)
+        if limit is not None:
+            select += f", {order} AS sort_key"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {select} FROM projects {where} ORDER BY {order} {direction}, id {direction}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        
+        with self._connection() as conn:
+            df = read_frame(query, conn, params=params)
+        
+        return df
     
-    def get_projects(self, status=None):
-        """Get projects, optionally filtered by status"""
-        conn = sqlite3.connect(self.db_name)
+    @cached_query
+    def count_projects(self, status=None, include_deleted=False, priority=None, department=None,
+                       min_score=None, max_score=None, start_date=None, end_date=None):
+        """Number of projects matching the get_projects filters.
         
-        if status:
-            query = "SELECT * FROM projects WHERE status = ? ORDER BY submission_date DESC"
-            df = pd.read_sql_query(query, conn, params=(status,))
+        Status, priority and department filters are answered from the
+        project_stats rollup; score and date filters need a COUNT over the
+        (partial) projects indexes.
+        """
+        conditions, params = self._project_filters(
+            status=status, priority=priority, department=department, include_deleted=include_deleted,
+            min_score=min_score, max_score=max_score, start_date=start_date, end_date=end_date
+        )
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if all(value is None for value in (min_score, max_score, start_date, end_date)):
+            query = f"SELECT COALESCE(SUM(project_count), 0) FROM project_stats {where}"
         else:
-            query = "SELECT * FROM projects ORDER BY submission_date DESC"
-            df = pd.read_sql_query(query, conn)
+            query = f"SELECT COUNT(*) FROM projects {where}"
+        with self._connection() as conn:
+            return conn.execute(query, params).fetchone()[0]
+    
+    def iter_projects(self, chunk_size=5000, include_deleted=False, since_seq=None):
+        """Yield projects newest first as typed DataFrames of at most chunk_size rows.
+        
+        Rows stream from a single query, so the chunks form one consistent
+        snapshot and memory stays bounded by the chunk size. With since_seq,
+        only rows written after that change_seq are returned (deleted ones
+        included, so readers see deletions) in change_seq order.
+        """
+        if since_seq is None:
+            conditions, params = self._project_filters(include_deleted=include_deleted)
+            order = "submission_date DESC, id DESC"
+        else:
+            conditions, params = ["change_seq > ?"], [int(since_seq)]
+            order = "change_seq"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT * FROM projects {where} ORDER BY {order}"
+        
+        with self._connection() as conn:
+            for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunk_size):
+                yield apply_dtypes(chunk)
+    
+    @cached_query
+    def get_text_lengths(self, include_deleted=False):
+        """Longest value per projects column, as text, in one aggregate pass"""
+        with self._connection() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(projects)")]
+            lengths = conn.execute(
+                f"""SELECT {', '.join(f'COALESCE(MAX(LENGTH({col})), 0)' for col in columns)}
+                    FROM projects {"" if include_deleted else "WHERE deleted = 0"}"""
+            ).fetchone()
+        return dict(zip(columns, lengths))
+    
+    @staticmethod
+    def _project_filters(status=None, priority=None, department=None, include_deleted=False,
+                         min_score=None, max_score=None, start_date=None, end_date=None, alias=''):
+        """SQL conditions and parameters for the get_projects filters"""
+        conditions, params = [], []
+        for column, value in (('status', status), ('priority', priority), ('department', department)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            conditions.append(f"{alias}{column} IN ({', '.join(['?' for _ in values])})")
+            params.extend(values)
+        if not include_deleted:
+            conditions.append(f"{alias}deleted = 0")
+        if min_score is not None:
+            conditions.append(f"{alias}total_score >= ?")
+            params.append(float(min_score))
+        if max_score is not None:
+            conditions.append(f"{alias}total_score <= ?")
+            params.append(float(max_score))
+        if start_date is not None:
+            conditions.append(f"{alias}submission_date >= ?")
+            params.append(str(start_date))
+        if end_date is not None:
+            if isinstance(end_date, date) and not isinstance(end_date, datetime):
+                conditions.append(f"{alias}submission_date < ?")
+                params.append(str(end_date + timedelta(days=1)))
+            else:
+                conditions.append(f"{alias}submission_date <= ?")
+                params.append(str(end_date))
+        return conditions, params
+    
+    @cached_query
+    def search_projects(self, query, filters=None, limit=50):
+        """Full-text search over project text fields, best matches first.
         
-        conn.close()
+        Every word in query must match (as a prefix) in one of SEARCH_COLUMNS.
+        filters takes the get_projects filter arguments (status, priority,
+        department, include_deleted, scores, dates). Results carry a
+        search_rank (BM25, lower is better) and a snippet with matches in **bold**.
+        """
+        match = fts_query(query)
+        if not match:
+            return pd.DataFrame(columns=['id', 'project_title', 'requestor_name', 'department', 'total_score',
+                                         'priority', 'status', 'assigned_to', 'submission_date', 'sla_deadline',
+                                         'snippet', 'search_rank'])
+        
+        conditions, params = self._project_filters(**(filters or {}), alias='p.')
+        where = ''.join(f" AND {condition}" for condition in conditions)
+        weights = ', '.join(str(weight) for weight in SEARCH_COLUMNS.values())
+        
+        # Rank and filter first, then build snippets for the returned rows only
+        with self._connection() as conn:
+            df = read_frame(
+                f"""WITH hits AS (
+                        SELECT p.id, bm25(projects_fts, {weights}) AS search_rank
+                        FROM projects_fts JOIN projects p ON p.id = projects_fts.rowid
+                        WHERE projects_fts MATCH ?{where}
+                        ORDER BY search_rank LIMIT ?
+                    )
+                    SELECT p.id, p.project_title, p.requestor_name, p.department, p.total_score,
+                           p.priority, p.status, p.assigned_to, p.submission_date, p.sla_deadline,
+                           snippet(projects_fts, -1, '**', '**', '…', 12) AS snippet, hits.search_rank
+                    FROM hits
+                    JOIN projects p ON p.id = hits.id
+                    JOIN projects_fts ON projects_fts.rowid = hits.id
+                    WHERE projects_fts MATCH ?
+                    ORDER BY hits.search_rank""",
+                conn, params=[match] + params + [int(limit), match]
+            )
         return df
     
+    @staticmethod
+    def next_page_key(page, order_column=None):
+        """Keyset for the page after this one, or None when it was the last.
+        
+        order_column defaults to sort_key (paginated get_projects results),
+        falling back to submission_date.
+        """
+        if len(page) == 0:
+            return None
+        if order_column is None:
+            order_column = 'sort_key' if 'sort_key' in page.columns else 'submission_date'
+        last = page[order_column].iat[-1]
+        # Parsed datetime columns go back to the stored text format
+        if isinstance(last, pd.Timestamp):
+            last = last.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(last, np.generic):
+            last = last.item()
+        return last, int(page['id'].iat[-1])
+    
+    def _select_list(self, columns):
+        """Validated column list for a projected SELECT on projects"""
+        if columns is None:
+            return '*'
+        if self._project_columns is None:
+            with self._connection() as conn:
+                self._project_columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(projects)")}
+        unknown = [col for col in columns if col not in self._project_columns]
+        if unknown:
+            raise ValueError(f"Unknown project columns: {', '.join(unknown)}")
+        selected = [col for col in ('id', 'submission_date') if col not in columns] + list(columns)
+        return ', '.join(selected)
+    
     def get_project(self, project_id):
-        """Get single project by ID"""
-        conn = sqlite3.connect(self.db_name)
-        query = "SELECT * FROM projects WHERE id = ?"
-        df = pd.read_sql_query(query, conn, params=(project_id,))
-        conn.close()
-        
-        if len(df) > 0:
-            return df.iloc[0].to_dict()
-        return None
+        """Get single project by ID as a plain dict, with option answers as labels"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute("SELECT * FROM projects WHERE id = ?", (int(project_id),))
+            row = c.fetchone()
+        return decode_answers(dict(row)) if row is not None else None
     
-    def update_project(self, project_id, data):
-        """Update project"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def get_projects_by_id(self, project_ids):
+        """Projects for a list of IDs, as {id: project dict}; missing IDs are left out"""
+        project_ids = [int(project_id) for project_id in project_ids]
+        if not project_ids:
+            return {}
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute(
+                f"SELECT * FROM projects WHERE id IN ({', '.join('?' * len(project_ids))})", project_ids
+            )
+            rows = c.fetchall()
+        return {row['id']: decode_answers(dict(row)) for row in rows}
+    
+    def get_change_seq(self):
+        """Current value of the projects change counter (see migration 10)"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM change_counter WHERE name = 'projects'").fetchone()
+        return row[0] if row else 0
+    
+    def get_changed_project_ids(self, since_seq):
+        """IDs of projects written after a change_seq"""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT id FROM projects WHERE change_seq > ?", (int(since_seq),)).fetchall()
+        return [row[0] for row in rows]
+    
+    def update_project(self, project_id, data, action='Project Updated', username=None, details=None,
+                       expected_seq=None):
+        """Update project and record the changed fields in the audit log.
+        
+        Pass the change_seq the caller read as expected_seq to update only if
+        nobody else has written the project since. A project leased to a
+        reviewer other than username (or co_reviewed_by) is not written
+        either. In both cases ConcurrencyError is raised and nothing is
+        written.
+        """
+        data = encode_answers(data)
+        username = username or data.get('co_reviewed_by')
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute(f"SELECT {', '.join(data.keys())}, change_seq FROM projects WHERE id = ?", (project_id,))
+            previous = c.fetchone()
+            
+            set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
+            values = list(data.values()) + [project_id, project_id, username, now]
+            version_check = ""
+            if expected_seq is not None:
+                version_check = " AND change_seq = ?"
+                values.append(int(expected_seq))
+            
+            c.execute(f'''
+                UPDATE projects
+                SET {set_clause}
+                WHERE id = ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM review_leases
+                      WHERE project_id = ? AND username IS NOT ? AND expires_date > ?
+                  ){version_check}
+            ''', values)
+            
+            if c.rowcount == 0 and previous is not None:
+                c.execute('''
+                    SELECT username FROM review_leases
+                    WHERE project_id = ? AND username IS NOT ? AND expires_date > ?
+                ''', (project_id, username, now))
+                holder = c.fetchone()
+                if holder is not None:
+                    raise ConcurrencyError(f"Project #{project_id} is being reviewed by {holder[0]}")
+                raise ConcurrencyError(
+                    f"Project #{project_id} was changed by someone else after you opened it"
+                )
+            
+            if previous is not None:
+                self._log_event(c, action, username, project_id, details,
+                                self._changes(data, previous[:-1]))
+    
+    @staticmethod
+    def _changes(data, previous):
+        """{column: [old, new]} for the fields of an encoded update that change a stored row.
+        
+        previous holds the stored values in data's field order. Option
+        answers are logged as labels, not codes.
+        """
+        old_labels = decode_answers(dict(zip(data.keys(), previous)))
+        new_labels = decode_answers(data)
+        return {
+            column: [old_labels[column], new_labels[column]]
+            for (column, new), old in zip(data.items(), previous) if old != new
+        }
+    
+    def bulk_update_projects(self, updates, action, username, details=None):
+        """Apply {project_id: data} updates, all setting the same fields, in one transaction.
         
-        set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
-        values = list(data.values()) + [project_id]
+        The rows are written with one executemany and the audit events with
+        another, so either every project is updated and logged or none is.
+        The write lock is taken before the checks, so no other writer can
+        delete or lease a project between them and the update. Raises
+        ValueError if any project is missing or deleted, and
+        ConcurrencyError if another reviewer holds a lease on one. Returns
+        the number of projects updated.
+        """
+        if not updates:
+            return 0
+        updates = {int(project_id): encode_answers(data) for project_id, data in updates.items()}
+        columns = list(next(iter(updates.values())))
+        if any(list(data) != columns for data in updates.values()):
+            raise ValueError("Bulk updates must set the same fields on every project")
+        project_ids = list(updates)
         
-        c.execute(f'''
-            UPDATE projects
-            SET {set_clause}
-            WHERE id = ?
-        ''', values)
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            
+            c.execute(f'''
+                SELECT id, {', '.join(columns)} FROM projects
+                WHERE deleted = 0 AND id IN ({', '.join('?' * len(project_ids))})
+            ''', project_ids)
+            previous = {row[0]: row[1:] for row in c.fetchall()}
+            missing = [project_id for project_id in project_ids if project_id not in previous]
+            if missing:
+                raise ValueError(f"Projects not found or deleted: {', '.join(f'#{pid}' for pid in missing)}")
+            
+            c.execute(f'''
+                SELECT project_id, username FROM review_leases
+                WHERE project_id IN ({', '.join('?' * len(project_ids))}) AND username != ? AND expires_date > ?
+            ''', (*project_ids, username, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            leased = c.fetchall()
+            if leased:
+                raise ConcurrencyError("Projects being reviewed by someone else: "
+                                       + ', '.join(f"#{pid} ({holder})" for pid, holder in leased))
+            
+            set_clause = ', '.join([f"{k} = ?" for k in columns])
+            c.executemany(
+                f"UPDATE projects SET {set_clause} WHERE id = ?",
+                [list(data.values()) + [project_id] for project_id, data in updates.items()]
+            )
+            
+            self._log_events(c, action, username, [
+                (project_id, self._changes(data, previous[project_id])) for project_id, data in updates.items()
+            ], details)
         
-        conn.commit()
-        conn.close()
+        return len(updates)
+    
+    def soft_delete_project(self, project_id, username, reason):
+        """Move a project to the deleted archive"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("SELECT status FROM projects WHERE id = ? AND deleted = 0", (project_id,))
+            row = c.fetchone()
+            if row is None:
+                raise ValueError(f"Project #{project_id} not found or already deleted")
+            
+            deleted_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            c.execute('''
+                UPDATE projects
+                SET deleted = 1, status = 'Deleted', deleted_by = ?, deleted_date = ?, deletion_reason = ?
+                WHERE id = ?
+            ''', (username, deleted_date, reason, project_id))
+            
+            self._log_event(c, 'Project Deleted', username, project_id, f"Reason: {reason}",
+                            {'status': [row[0], 'Deleted'], 'deleted': [0, 1]})
+    
+    @cached_query
+    def get_deleted_projects(self):
+        """Get archived projects, most recently deleted first"""
+        with self._connection() as conn:
+            df = read_frame(
+                "SELECT * FROM projects WHERE deleted = 1 ORDER BY deleted_date DESC, id DESC", conn
+            )
+        return df
+    
+    def restore_project(self, project_id, username=None):
+        """Move a project from the archive back to the Submitted queue"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("SELECT deleted_by, deletion_reason FROM projects WHERE id = ? AND deleted = 1", (project_id,))
+            row = c.fetchone()
+            if row is None:
+                raise ValueError(f"Project #{project_id} is not in the deleted archive")
+            
+            c.execute('''
+                UPDATE projects
+                SET deleted = 0, status = 'Submitted', deleted_by = NULL, deleted_date = NULL, deletion_reason = NULL
+                WHERE id = ?
+            ''', (project_id,))
+            
+            self._log_event(c, 'Project Restored', username, project_id,
+                            f"Deleted by {row[0]}: {row[1]}", {'status': ['Deleted', 'Submitted'], 'deleted': [1, 0]})
+    
+    @cached_query
+    def get_usernames(self, role=None):
+        """Usernames, optionally only those with a given role"""
+        with self._connection() as conn:
+            if role is None:
+                rows = conn.execute("SELECT username FROM users ORDER BY username").fetchall()
+            else:
+                rows = conn.execute("SELECT username FROM users WHERE role = ? ORDER BY username", (role,)).fetchall()
+        return [row[0] for row in rows]
     
     def authenticate(self, username, password):
         """Simple authentication"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
-        c.execute('''
-            SELECT username, role, email FROM users
-            WHERE username = ? AND password = ?
-        ''', (username, password))
-        
-        result = c.fetchone()
-        conn.close()
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                SELECT username, role, email FROM users
+                WHERE username = ? AND password = ?
+            ''', (username, password))
+            
+            result = c.fetchone()
         
         if result:
             return {
@@ -201,40 +911,634 @@ class Database:
             }
         return None
     
-    def get_statistics(self):
-        """Get dashboard statistics"""
-        conn = sqlite3.connect(self.db_name)
+    @cached_query
+    def get_statistics(self, include_deleted=False):
+        """Get dashboard statistics from the project_stats rollup"""
+        with self._connection() as conn:
+            stats = {}
+            
+            # One row per status x priority x department group, kept current by triggers
+            groups = pd.read_sql_query(
+                """SELECT NULLIF(status, '') AS status, NULLIF(priority, '') AS priority,
+                          NULLIF(department, '') AS department, deleted, project_count, score_sum, score_count
+                   FROM project_stats""", conn
+            )
+            
+            # Recent high-priority
+            stats['high_priority'] = read_frame(
+                f"""SELECT project_title, requestor_name, department, total_score, submission_date
+                    FROM projects 
+                    WHERE priority = ? AND status = 'Submitted' {"" if include_deleted else "AND deleted = 0"}
+                    ORDER BY total_score DESC LIMIT 5""", conn, params=(PRIORITY_LEVELS[0],)
+            )
         
-        stats = {}
+        # Archive size, then only active groups unless deleted ones were asked for
+        stats['deleted'] = int(groups.loc[groups['deleted'] == 1, 'project_count'].sum())
+        if not include_deleted:
+            groups = groups[groups['deleted'] == 0]
         
         # Total projects
-        stats['total'] = pd.read_sql_query(
-            "SELECT COUNT(*) as count FROM projects", conn
-        ).iloc[0]['count']
+        stats['total'] = int(groups['project_count'].sum())
         
         # By status
-        stats['by_status'] = pd.read_sql_query(
-            "SELECT status, COUNT(*) as count FROM projects GROUP BY status", conn
+        stats['by_status'] = (
+            groups.groupby('status', dropna=False)['project_count'].sum()
+            .rename('count').reset_index()
         )
         
         # By priority
-        stats['by_priority'] = pd.read_sql_query(
-            "SELECT priority, COUNT(*) as count FROM projects GROUP BY priority", conn
+        stats['by_priority'] = (
+            groups.groupby('priority', dropna=False)['project_count'].sum()
+            .rename('count').reset_index()
         )
         
         # Average scores by department
-        stats['avg_by_dept'] = pd.read_sql_query(
-            """SELECT department, AVG(total_score) as avg_score, COUNT(*) as count 
-               FROM projects GROUP BY department""", conn
-        )
+        by_dept = groups.groupby('department', dropna=False)[['score_sum', 'score_count', 'project_count']].sum()
+        stats['avg_by_dept'] = pd.DataFrame({
+            'department': by_dept.index,
+            'avg_score': (by_dept['score_sum'] / by_dept['score_count'].where(by_dept['score_count'] > 0)).to_numpy(),
+            'count': by_dept['project_count'].to_numpy()
+        })
         
-        # Recent high-priority
-        stats['high_priority'] = pd.read_sql_query(
-            """SELECT project_title, requestor_name, department, total_score, submission_date
-               FROM projects 
-               WHERE priority = 'IMMEDIATE' AND status = 'Submitted'
-               ORDER BY total_score DESC LIMIT 5""", conn
-        )
+        # Overall average score
+        score_count = groups['score_count'].sum()
+        stats['avg_score'] = float(groups['score_sum'].sum() / score_count) if score_count > 0 else None
+        
+        # Approval rate among decided projects (percent)
+        decided = groups.groupby('status')['project_count'].sum().reindex(['Approved', 'Rejected'], fill_value=0)
+        stats['approval_rate'] = float(decided['Approved'] / decided.sum() * 100) if decided.sum() > 0 else None
+        
+        # Department with the most projects
+        if by_dept['project_count'].sum() > 0:
+            top = by_dept['project_count'].idxmax()
+            stats['top_department'] = (top, int(by_dept.loc[top, 'project_count']))
+        else:
+            stats['top_department'] = None
         
-        conn.close()
         return stats
+    
+    @cached_query
+    def get_score_histogram(self, bins=20, low=0, high=100, include_deleted=False):
+        """Count projects per total_score bin over [low, high], computed in SQL.
+        
+        Returns one row per bin (bin_start, bin_end, count), including empty
+        bins. Scores outside the range are counted in the first or last bin.
+        """
+        width = (high - low) / bins
+        with self._connection() as conn:
+            counts = pd.read_sql_query(
+                f"""SELECT MAX(0, MIN(CAST((total_score - ?) / ? AS INTEGER), ? - 1)) AS bin, COUNT(*) AS count
+                    FROM projects
+                    WHERE total_score IS NOT NULL {"" if include_deleted else "AND deleted = 0"}
+                    GROUP BY bin""", conn, params=(low, width, bins)
+            )
+        
+        starts = low + width * np.arange(bins)
+        return pd.DataFrame({
+            'bin_start': starts,
+            'bin_end': starts + width,
+            'count': counts.set_index('bin')['count'].reindex(range(bins), fill_value=0).to_numpy()
+        })
+    
+    @cached_query
+    def get_submission_counts(self, period='day', include_deleted=False):
+        """Projects submitted per day, week (starting Monday) or month, oldest first"""
+        if period not in SUBMISSION_PERIODS:
+            raise ValueError(f"Unknown period '{period}', expected one of {list(SUBMISSION_PERIODS)}")
+        with self._connection() as conn:
+            counts = pd.read_sql_query(
+                f"""SELECT {SUBMISSION_PERIODS[period]} AS period, COUNT(*) AS count
+                    FROM projects {"" if include_deleted else "WHERE deleted = 0"}
+                    GROUP BY period ORDER BY period""", conn
+            )
+        counts['period'] = pd.to_datetime(counts['period'], format='ISO8601', errors='coerce')
+        return counts
+    
+    def rebuild_statistics(self):
+        """Recompute the project_stats rollup from the projects table"""
+        with self._connection() as conn:
+            rebuild_project_stats(conn.cursor())
+    
+    @cached_query
+    def get_rubric(self, version=None):
+        """Get compiled scoring rubric (latest version if none given)"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            if version is None:
+                c.execute('''
+                    SELECT version, weights, thresholds, option_maps, rules FROM scoring_rubrics
+                    ORDER BY version DESC LIMIT 1
+                ''')
+            else:
+                c.execute('''
+                    SELECT version, weights, thresholds, option_maps, rules FROM scoring_rubrics
+                    WHERE version = ?
+                ''', (int(version),))
+            
+            row = c.fetchone()
+        
+        if row is None:
+            if version is None:
+                raise LookupError("No scoring rubric configured")
+            # Unknown version on an old row - fall back to the active rubric
+            return self.get_rubric()
+        return load_rubric(*row)
+    
+    def save_rubric(self, weights, thresholds, option_maps, created_by, notes=None):
+        """Store a new rubric version under the current scoring rules and return its version number"""
+        validate_rubric(weights, thresholds, option_maps)
+        
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute('''
+                INSERT INTO scoring_rubrics (weights, thresholds, option_maps, rules, created_by, created_date, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (*rubric_json(weights, thresholds, option_maps), SCORING_RULES, created_by,
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S"), notes))
+            
+            version = c.lastrowid
+            self._log_event(c, 'Rubric Created', created_by, details=f"Version {version}: {notes or ''}".strip())
+        
+        return version
+    
+    @cached_query
+    def get_rubric_history(self):
+        """Get all rubric versions, newest first"""
+        with self._connection() as conn:
+            df = pd.read_sql_query(
+                """SELECT version, created_by, created_date, notes
+                   FROM scoring_rubrics ORDER BY version DESC""", conn
+            )
+        return df
+    
+    def get_rescore_job(self, job_id=None):
+        """Get a re-score job (latest if no ID given) as a dict"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            
+            if job_id is None:
+                c.execute("SELECT * FROM rescore_jobs ORDER BY id DESC LIMIT 1")
+            else:
+                c.execute("SELECT * FROM rescore_jobs WHERE id = ?", (job_id,))
+            
+            row = c.fetchone()
+        return dict(row) if row else None
+    
+    def start_rescore_job(self, rubric_version, started_by, statuses=('Submitted',)):
+        """Create a re-score job, or return the unfinished one for the same rubric"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            statuses_key = ','.join(statuses)
+            
+            c.execute('''
+                SELECT id FROM rescore_jobs
+                WHERE status != 'completed' AND rubric_version = ? AND statuses = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (rubric_version, statuses_key))
+            row = c.fetchone()
+            
+            if row:
+                job_id = row[0]
+            else:
+                placeholders = ', '.join(['?' for _ in statuses])
+                c.execute(f"SELECT COUNT(*) FROM projects WHERE status IN ({placeholders})", list(statuses))
+                total = c.fetchone()[0]
+                
+                c.execute('''
+                    INSERT INTO rescore_jobs (rubric_version, statuses, total, started_by, started_date)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (rubric_version, statuses_key, total, started_by,
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                job_id = c.lastrowid
+            
+        return job_id
+    
+    def run_rescore_job(self, job_id, chunk_size=2000, progress_callback=None):
+        """Re-score projects for a job in keyset-ordered chunks, resuming from its checkpoint.
+        
+        Each chunk is scored with calculate_batch_scores and written back in one
+        short transaction together with the job checkpoint, so a crash loses at
+        most the chunk in flight. Projects with a reviewer's co_final_score take
+        their priority from it rather than from the raw section scores.
+        progress_callback(processed, total) is called after every chunk.
+        """
+        job = self.get_rescore_job(job_id)
+        rubric = self.get_rubric(job['rubric_version'])
+        statuses = job['statuses'].split(',')
+        placeholders = ', '.join(['?' for _ in statuses])
+        
+        select_cols = ', '.join(['id'] + SCORING_INPUTS + SCORE_COLUMNS
+                                + ['total_score', 'priority', 'rubric_version', 'co_final_score'])
+        set_clause = ', '.join([f"{col} = ?" for col in SCORE_COLUMNS + ['total_score', 'priority', 'op_blocker']])
+        
+        with self._connection() as conn:
+            c = conn.cursor()
+            last_id, processed, changed = job['last_id'], job['processed'], job['changed']
+            
+            try:
+                c.execute("UPDATE rescore_jobs SET status = 'running', error = NULL WHERE id = ?", (job_id,))
+                conn.commit()
+                
+                while True:
+                    chunk = pd.read_sql_query(
+                        f"""SELECT {select_cols}
+                            FROM projects
+                            WHERE id > ? AND status IN ({placeholders})
+                            ORDER BY id LIMIT ?""",
+                        conn, params=[last_id] + statuses + [chunk_size]
+                    )
+                    if chunk.empty:
+                        break
+                    
+                    # Rows stored before op_blocker existed get it inferred from op_score
+                    missing_blocker = chunk['op_blocker'].isna().to_numpy()
+                    if missing_blocker.any():
+                        chunk.loc[missing_blocker, 'op_blocker'] = ENUMS['op_blocker'].encode(
+                            infer_op_blocker(chunk[missing_blocker])
+                        )
+                    
+                    scores = calculate_batch_scores(chunk, rubric)
+                    
+                    # Reviewer overrides keep deciding priority, under the new thresholds
+                    final_score = chunk['co_final_score'].to_numpy(dtype=np.float64)
+                    overridden = ~np.isnan(final_score)
+                    if overridden.any():
+                        scores['priority'][overridden] = get_batch_priority(final_score[overridden], rubric)
+                    
+                    # Only write rows whose result or rubric version actually changed
+                    differs = missing_blocker | (chunk['priority'].to_numpy(dtype=object) != scores['priority'])
+                    differs |= chunk['rubric_version'].to_numpy(dtype=np.float64) != rubric.version
+                    for col in SCORE_COLUMNS + ['total_score']:
+                        differs |= ~np.isclose(chunk[col].to_numpy(dtype=np.float64), scores[col], equal_nan=False)
+                    
+                    rows = [
+                        [float(scores[col][i]) for col in SCORE_COLUMNS + ['total_score']]
+                        + [scores['priority'][i], int(chunk['op_blocker'].iat[i]), rubric.version, int(chunk['id'].iat[i])]
+                        for i in np.flatnonzero(differs)
+                    ]
+                    
+                    last_id = int(chunk['id'].iat[-1])
+                    processed += len(chunk)
+                    changed += len(rows)
+                    
+                    with conn:
+                        c.executemany(
+                            f"UPDATE projects SET {set_clause}, rubric_version = ? WHERE id = ?", rows
+                        )
+                        c.execute('''
+                            UPDATE rescore_jobs
+                            SET last_id = ?, processed = ?, changed = ?, updated_date = ?
+                            WHERE id = ?
+                        ''', (last_id, processed, changed,
+                              datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+                    
+                    if progress_callback:
+                        progress_callback(processed, job['total'])
+                
+                c.execute('''
+                    UPDATE rescore_jobs SET status = 'completed', finished_date = ? WHERE id = ?
+                ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+                self._log_event(c, 'Projects Re-scored', job['started_by'],
+                                details=f"Rubric v{rubric.version}: {changed} of {processed} projects changed")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                c.execute("UPDATE rescore_jobs SET status = 'failed', error = ? WHERE id = ?", (str(e), job_id))
+                conn.commit()
+                raise
+        
+        return self.get_rescore_job(job_id)
+    
+    @cached_query
+    def get_section_scores(self):
+        """Get effective section scores (overrides applied) for every active project"""
+        effective = ', '.join([f"COALESCE(co_override_{s}, {s}_score) AS {s}" for s in SECTIONS])
+        with self._connection() as conn:
+            df = pd.read_sql_query(
+                f"SELECT id, department, {effective} FROM projects WHERE deleted = 0 ORDER BY id", conn
+            )
+        return df
+    
+    def refresh_red_flags(self, username=None):
+        """Re-evaluate red flag rules over all projects and store changed results"""
+        with self._connection() as conn:
+            projects = pd.read_sql_query(
+                f"SELECT id, red_flags, auto_reject, {', '.join(RED_FLAG_COLUMNS)} FROM projects", conn
+            )
+            # Rules compare option answers by label
+            apply_dtypes(projects, {column: PROJECT_DTYPES[column] for column in RED_FLAG_COLUMNS})
+            
+            red_flags, auto_reject = evaluate_red_flags(projects)
+            
+            stored_flags = projects['red_flags'].where(projects['red_flags'].notna(), None).to_numpy(dtype=object)
+            stored_reject = projects['auto_reject'].fillna(0).to_numpy()
+            changed = np.flatnonzero((stored_flags != red_flags) | (stored_reject != auto_reject))
+            
+            with conn:
+                conn.executemany(
+                    "UPDATE projects SET red_flags = ?, auto_reject = ? WHERE id = ?",
+                    [(red_flags[i], int(auto_reject[i]), int(projects['id'].iat[i])) for i in changed]
+                )
+                self._log_event(conn.cursor(), 'Red Flags Re-evaluated', username,
+                                details=f"{len(changed)} of {len(projects)} projects changed")
+        
+        return len(changed)
+    
+    # Review leases
+    
+    def claim_next(self, username, minutes=LEASE_MINUTES, exclude=()):
+        """Lease the next queued project nobody else holds; returns its ID or None.
+        
+        Projects come in SLA deadline order (overdue first), then by priority
+        for those without a deadline. The pick and the lease are one
+        INSERT ... SELECT, so two reviewers asking at the same time always
+        get different projects. exclude skips projects the reviewer has
+        already passed over.
+        """
+        now = datetime.now()
+        exclude = [int(project_id) for project_id in exclude]
+        excluded = f"AND p.id NOT IN ({', '.join('?' * len(exclude))})" if exclude else ""
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.execute("DELETE FROM review_leases WHERE expires_date <= ?", (now.strftime("%Y-%m-%d %H:%M:%S"),))
+            c.execute(f'''
+                INSERT INTO review_leases (project_id, username, claimed_date, expires_date)
+                SELECT p.id, ?, ?, ? FROM projects p
+                WHERE p.deleted = 0
+                  AND p.status IN ({', '.join('?' * len(QUEUE_STATUSES))})
+                  {excluded}
+                  AND NOT EXISTS (SELECT 1 FROM review_leases l WHERE l.project_id = p.id)
+                ORDER BY {SLA_ORDER}, {PRIORITY_ORDER}, p.id
+                LIMIT 1
+                RETURNING project_id
+            ''', (username, now.strftime("%Y-%m-%d %H:%M:%S"),
+                  (now + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S"), *QUEUE_STATUSES, *exclude))
+            row = c.fetchone()
+        return row[0] if row else None
+    
+    def claim_project(self, project_id, username, minutes=LEASE_MINUTES):
+        """Lease (or renew) one project; False if someone else holds an unexpired lease.
+        
+        A lease of username's with more than half its time left is kept as
+        is, so reruns of an open project do not write (and clear the result
+        cache) every time.
+        """
+        now = datetime.now()
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT username, expires_date FROM review_leases WHERE project_id = ?", (int(project_id),))
+            lease = c.fetchone()
+            renew_after = (now + timedelta(minutes=minutes / 2)).strftime("%Y-%m-%d %H:%M:%S")
+            if lease is not None and lease[0] == username and lease[1] > renew_after:
+                return True
+            
+            c.execute('''
+                INSERT INTO review_leases (project_id, username, claimed_date, expires_date)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (project_id) DO UPDATE SET
+                    username = excluded.username,
+                    claimed_date = CASE WHEN review_leases.username = excluded.username
+                                        THEN review_leases.claimed_date ELSE excluded.claimed_date END,
+                    expires_date = excluded.expires_date
+                WHERE review_leases.username = excluded.username OR review_leases.expires_date <= excluded.claimed_date
+                RETURNING project_id
+            ''', (int(project_id), username, now.strftime("%Y-%m-%d %H:%M:%S"),
+                  (now + timedelta(minutes=minutes)).strftime("%Y-%m-%d %H:%M:%S")))
+            return c.fetchone() is not None
+    
+    def release_lease(self, project_id, username):
+        """Give up a lease held by username"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM review_leases WHERE project_id = ? AND username = ?", (int(project_id), username))
+    
+    def get_leases(self, project_ids):
+        """Unexpired leases for a list of projects, as {project_id: lease dict}"""
+        project_ids = [int(project_id) for project_id in project_ids]
+        if not project_ids:
+            return {}
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute(f'''
+                SELECT * FROM review_leases
+                WHERE project_id IN ({', '.join('?' * len(project_ids))}) AND expires_date > ?
+            ''', (*project_ids, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            rows = c.fetchall()
+        return {row['project_id']: dict(row) for row in rows}
+    
+    # SLA scheduling
+    
+    @cached_query
+    def next_due(self, n=10):
+        """The n open projects with the earliest SLA deadlines (overdue ones first)"""
+        with self._connection() as conn:
+            df = read_frame(f'''
+                SELECT id, project_title, department, priority, status, total_score, assigned_to,
+                       submission_date, sla_deadline
+                FROM projects
+                WHERE deleted = 0 AND sla_deadline IS NOT NULL
+                ORDER BY {SLA_ORDER}, id
+                LIMIT ?
+            ''', conn, params=(int(n),))
+        return df
+    
+    def get_sla_summary(self, at_risk_hours=AT_RISK_HOURS):
+        """Open projects past their SLA deadline, and those due within at_risk_hours"""
+        now = datetime.now()
+        with self._connection() as conn:
+            overdue, due_soon = conn.execute(f'''
+                SELECT (SELECT COUNT(*) FROM projects WHERE deleted = 0 AND {SLA_ORDER} < ?),
+                       (SELECT COUNT(*) FROM projects WHERE deleted = 0 AND {SLA_ORDER} < ?)
+            ''', (now.strftime("%Y-%m-%d %H:%M:%S"),
+                  (now + timedelta(hours=at_risk_hours)).strftime("%Y-%m-%d %H:%M:%S"))).fetchone()
+        return {'overdue': overdue, 'at_risk': due_soon - overdue}
+    
+    # Export jobs
+    
+    def start_export_job(self, fmt, requested_by, since_seq=None):
+        """Create an export job, or reuse one for the same format and watermark.
+        
+        A completed job is reused while its file still exists and nothing has
+        changed since it was written (its through_seq equals the current
+        change_seq); otherwise an unfinished one is shared. Returns
+        (job_id, created).
+        """
+        with self._connection() as conn:
+            c = conn.cursor()
+            
+            c.execute("SELECT value FROM change_counter WHERE name = 'projects'")
+            row = c.fetchone()
+            c.execute('''
+                SELECT id, file_path FROM export_jobs
+                WHERE status = 'completed' AND format = ? AND since_seq IS ? AND through_seq = ?
+                ORDER BY id DESC
+            ''', (fmt, since_seq, row[0] if row else 0))
+            for job_id, file_path in c.fetchall():
+                if file_path and os.path.exists(file_path):
+                    return job_id, False
+            
+            c.execute('''
+                SELECT id FROM export_jobs
+                WHERE status IN ('queued', 'running') AND format = ? AND since_seq IS ?
+                ORDER BY id DESC LIMIT 1
+            ''', (fmt, since_seq))
+            row = c.fetchone()
+            if row:
+                return row[0], False
+            
+            if since_seq is None:
+                c.execute("SELECT COUNT(*) FROM projects WHERE deleted = 0")
+            else:
+                c.execute("SELECT COUNT(*) FROM projects WHERE change_seq > ?", (int(since_seq),))
+            total = c.fetchone()[0]
+            c.execute('''
+                INSERT INTO export_jobs (format, since_seq, total, requested_by, requested_date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (fmt, since_seq, total, requested_by, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            return c.lastrowid, True
+    
+    def get_last_export_job(self, fmt):
+        """Most recent completed export job for a format, as a dict"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute(
+                "SELECT * FROM export_jobs WHERE status = 'completed' AND format = ? ORDER BY id DESC LIMIT 1",
+                (fmt,)
+            )
+            row = c.fetchone()
+        return dict(row) if row else None
+    
+    def get_export_job(self, job_id):
+        """Get an export job as a dict"""
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute("SELECT * FROM export_jobs WHERE id = ?", (job_id,))
+            row = c.fetchone()
+        return dict(row) if row else None
+    
+    def get_export_jobs(self, job_ids):
+        """Get export jobs as dicts, newest first"""
+        if not job_ids:
+            return []
+        with self._connection() as conn:
+            c = conn.cursor()
+            c.row_factory = sqlite3.Row
+            c.execute(
+                f"SELECT * FROM export_jobs WHERE id IN ({', '.join(['?' for _ in job_ids])}) ORDER BY id DESC",
+                [int(job_id) for job_id in job_ids]
+            )
+            rows = c.fetchall()
+        return [dict(row) for row in rows]
+    
+    def update_export_job(self, job_id, **fields):
+        """Set status, progress or result fields of an export job"""
+        set_clause = ', '.join([f"{k} = ?" for k in fields])
+        with self._connection() as conn:
+            conn.execute(f"UPDATE export_jobs SET {set_clause} WHERE id = ?", list(fields.values()) + [job_id])
+    
+    # Audit log
+    
+    @staticmethod
+    def _log_event(cursor, action, username, project_id=None, details=None, changes=None):
+        """Append an audit event inside the caller's transaction"""
+        cursor.execute('''
+            INSERT INTO audit_events (event_date, username, action, project_id, details, changes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), username, action,
+              None if project_id is None else int(project_id), details,
+              json.dumps(changes, default=_json_default) if changes else None))
+    
+    @staticmethod
+    def _log_events(cursor, action, username, events, details=None):
+        """Append one audit event per (project_id, changes) pair with a single executemany"""
+        event_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.executemany('''
+            INSERT INTO audit_events (event_date, username, action, project_id, details, changes)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (event_date, username, action, int(project_id), details,
+             json.dumps(changes, default=_json_default) if changes else None)
+            for project_id, changes in events
+        ])
+    
+    @staticmethod
+    def _audit_filters(actions=None, users=None, start_date=None, end_date=None, project_id=None):
+        """WHERE clause and parameters for audit event queries"""
+        conditions, params = [], []
+        for column, values in (('a.action', actions), ('a.username', users)):
+            if values:
+                conditions.append(f"{column} IN ({', '.join(['?' for _ in values])})")
+                params.extend(values)
+        if project_id is not None:
+            conditions.append("a.project_id = ?")
+            params.append(int(project_id))
+        if start_date is not None:
+            conditions.append("a.event_date >= ?")
+            params.append(str(start_date))
+        if end_date is not None:
+            if isinstance(end_date, date) and not isinstance(end_date, datetime):
+                end_date = end_date + timedelta(days=1)
+            conditions.append("a.event_date < ?")
+            params.append(str(end_date))
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+    
+    @cached_query
+    def get_audit_events(self, actions=None, users=None, start_date=None, end_date=None,
+                         project_id=None, after=None, limit=50):
+        """Get audit events newest first, filtered in SQL.
+        
+        A plain date as end_date includes that whole day. For the next page pass
+        after=next_page_key(previous_page, 'event_date').
+        """
+        where, params = self._audit_filters(actions, users, start_date, end_date, project_id)
+        if after is not None:
+            where += (" AND " if where else "WHERE ") + "(a.event_date, a.id) < (?, ?)"
+            params.extend([after[0], int(after[1])])
+        query = f"""SELECT a.id, a.event_date, a.action, a.username, a.project_id,
+                           p.project_title, a.details, a.changes
+                    FROM audit_events a LEFT JOIN projects p ON p.id = a.project_id
+                    {where}
+                    ORDER BY a.event_date DESC, a.id DESC"""
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        
+        with self._connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        return df
+    
+    @cached_query
+    def count_audit_events(self, actions=None, users=None, start_date=None, end_date=None, project_id=None):
+        """Number of audit events matching the filters"""
+        where, params = self._audit_filters(actions, users, start_date, end_date, project_id)
+        with self._connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM audit_events a {where}", params).fetchone()[0]
+    
+    @cached_query
+    def get_audit_filter_options(self):
+        """Distinct actions and users present in the audit log"""
+        with self._connection() as conn:
+            actions = [row[0] for row in conn.execute("SELECT DISTINCT action FROM audit_events ORDER BY action")]
+            users = [row[0] for row in conn.execute(
+                "SELECT DISTINCT username FROM audit_events WHERE username IS NOT NULL ORDER BY username"
+            )]
+        return actions, users
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_name="project_scoring.db"):
+    """Process-wide Database shared by every session, so the schema is set up once"""
+    key = os.path.abspath(db_name)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = Database(db_name)
+        return database
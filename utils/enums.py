@@ -0,0 +1,265 @@
+import numpy as np
+import pandas as pd
+
+
+class OptionEnum:
+    """Integer codes for a single-choice answer field.
+    
+    Code i stands for labels[i]. Missing answers (None, NaN, '') have no
+    code and are stored as NULL. Aliases are older or shorthand spellings
+    that map onto a label. Anything else raises ValueError, so a form
+    option that does not match the registry fails on save instead of
+    silently scoring as the default.
+    """
+    __slots__ = ('field', 'labels', 'aliases', '_codes', '_index', '_index_codes')
+    
+    def __init__(self, field, labels, aliases=None):
+        self.field = field
+        self.labels = tuple(labels)
+        self.aliases = dict(aliases or {})
+        self._codes = {label: i for i, label in enumerate(self.labels)}
+        for alias, label in self.aliases.items():
+            self._codes[alias] = self._codes[label]
+        self._index = pd.Index(list(self._codes), dtype=object)
+        # Code per index entry, plus -1 in the last slot for lookups that miss
+        self._index_codes = np.array(list(self._codes.values()) + [-1], dtype=np.int64)
+    
+    def code(self, value):
+        """Code for one answer (label, alias or code); None if missing"""
+        if _is_missing(value):
+            return None
+        if isinstance(value, (int, np.integer, float, np.floating)):
+            if float(value).is_integer() and 0 <= int(value) < len(self.labels):
+                return int(value)
+        elif value in self._codes:
+            return self._codes[value]
+        raise ValueError(f"Unknown option for {self.field}: {value!r}")
+    
+    def encode(self, values):
+        """Codes for an array of answers (-1 where missing)"""
+        values = pd.Series(np.asarray(values, dtype=object))
+        if pd.api.types.is_numeric_dtype(values.infer_objects()):
+            return self.check_codes(values)
+        missing = values.isna().to_numpy() | (values == '').to_numpy()
+        positions = self._index.get_indexer(values.where(~missing, None).to_numpy(dtype=object))
+        unknown = (positions < 0) & ~missing
+        if unknown.any():
+            raise ValueError(f"Unknown options for {self.field}: {sorted(set(values[unknown]))}")
+        return self._index_codes[positions]
+    
+    def check_codes(self, values):
+        """Validate stored codes (NaN allowed) and return them as int64 with -1 for missing"""
+        values = pd.to_numeric(pd.Series(values), errors='coerce')
+        codes = values.fillna(-1).to_numpy(dtype=np.int64)
+        if ((codes < -1) | (codes >= len(self.labels))).any():
+            raise ValueError(f"Invalid stored codes for {self.field}")
+        return codes
+    
+    def label(self, code):
+        """Label for one stored code"""
+        if _is_missing(code):
+            return None
+        return self.labels[int(code)]
+    
+    def decode(self, codes):
+        """Categorical of labels for an array of stored codes"""
+        return pd.Categorical.from_codes(self.check_codes(codes), categories=self.labels)
+
+
+class OptionSet:
+    """Bitmask codes for a multi-select answer field (bit i is labels[i]).
+    
+    Selections are written as a comma-separated label string or a list;
+    0 means nothing was selected and NULL that the question was not answered.
+    """
+    __slots__ = ('field', 'labels', 'aliases', '_bits', '_label_cache')
+    
+    def __init__(self, field, labels, aliases=None):
+        self.field = field
+        self.labels = tuple(labels)
+        self.aliases = dict(aliases or {})
+        self._bits = {label: 1 << i for i, label in enumerate(self.labels)}
+        for alias, label in self.aliases.items():
+            self._bits[alias] = self._bits[label]
+        self._label_cache = {}
+    
+    def bit(self, label):
+        """Bit for a single label or alias"""
+        if label not in self._bits:
+            raise ValueError(f"Unknown option for {self.field}: {label!r}")
+        return self._bits[label]
+    
+    def code(self, value):
+        """Bitmask for one answer (comma-separated labels, list or mask)"""
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return None
+        if isinstance(value, (int, np.integer, float, np.floating)):
+            if float(value).is_integer() and 0 <= int(value) < 1 << len(self.labels):
+                return int(value)
+            raise ValueError(f"Invalid stored mask for {self.field}: {value!r}")
+        if isinstance(value, str):
+            value = value.split(',')
+        mask = 0
+        for label in value:
+            label = label.strip()
+            if label:
+                mask |= self.bit(label)
+        return mask
+    
+    def encode(self, values):
+        """Masks for an array of answers (-1 where not answered)"""
+        values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values)
+        masks = np.array([self.code(v) for v in uniques] + [-1], dtype=np.int64)
+        return masks[codes]
+    
+    def check_codes(self, values):
+        """Validate stored masks (NaN allowed) and return them as int64 with -1 for missing"""
+        values = pd.to_numeric(pd.Series(values), errors='coerce')
+        masks = values.fillna(-1).to_numpy(dtype=np.int64)
+        if ((masks < -1) | (masks >= 1 << len(self.labels))).any():
+            raise ValueError(f"Invalid stored masks for {self.field}")
+        return masks
+    
+    def label(self, mask):
+        """Comma-separated labels for one stored mask"""
+        if _is_missing(mask):
+            return None
+        mask = int(mask)
+        if mask not in self._label_cache:
+            self._label_cache[mask] = ','.join(label for i, label in enumerate(self.labels) if mask >> i & 1)
+        return self._label_cache[mask]
+    
+    def decode(self, masks):
+        """Categorical of comma-separated labels for an array of stored masks"""
+        codes, uniques = pd.factorize(pd.Series(masks), use_na_sentinel=True)
+        return pd.Categorical.from_codes(codes, categories=[self.label(mask) for mask in uniques])
+
+
+def _is_missing(value):
+    """True for None, NaN and empty strings"""
+    if value is None or (isinstance(value, str) and value == ''):
+        return True
+    return isinstance(value, (float, np.floating)) and np.isnan(value)
+
+
+YES_NO = ("YES", "NO")
+
+# Registry of coded answer fields, in form order. Aliases keep rows and
+# rubrics written with earlier wording readable.
+ENUMS = {enum.field: enum for enum in [
+    OptionEnum('reg_required', YES_NO),
+    OptionEnum('reg_deadline', ["<3 months", "3-6 months", "6-12 months", ">12 months", "No specific deadline"]),
+    OptionEnum('reg_enforcement', YES_NO),
+    OptionEnum('rep_risk_level', [
+        "1 - Minimal risk",
+        "2 - Low risk, proactive measure",
+        "3 - Moderate risk, potential exposure",
+        "4 - High risk, known vulnerability",
+        "5 - Critical risk, active issue"
+    ]),
+    OptionEnum('rep_liability', ["No apparent monetary exposure", "<€100K", "€100K-€1M", ">€1M"]),
+    OptionEnum('strat_document', [
+        "CEO/Board strategic plan",
+        "Division/BU annual strategy",
+        "Departmental objectives",
+        "Operational improvement",
+        "Not in strategic documentation"
+    ], aliases={"Not in strategic docs": "Not in strategic documentation"}),
+    OptionEnum('strat_sponsor', YES_NO),
+    OptionEnum('strat_budget', YES_NO),
+    OptionEnum('op_scope', [
+        "Single team",
+        "Single business unit",
+        "2+ business units",
+        "2+ business units plus external stakeholders"
+    ], aliases={"3+ business units": "2+ business units plus external stakeholders"}),
+    OptionEnum('op_blocker', YES_NO),
+    OptionEnum('res_approach', [
+        "Use existing tool/platform with configuration only",
+        "Extend or integrate with existing platform",
+        "Deploy new tool with standard implementation",
+        "Custom development required",
+        "Major system overhaul or multiple system integration"
+    ], aliases={
+        "Existing tool/platform, configuration only": "Use existing tool/platform with configuration only",
+        "Extend existing platform": "Extend or integrate with existing platform",
+        "New tool, standard implementation": "Deploy new tool with standard implementation",
+        "Custom development": "Custom development required",
+        "Major system overhaul": "Major system overhaul or multiple system integration"
+    }),
+    OptionEnum('data_type', [
+        "Public or low-sensitivity data",
+        "Internal confidential business data",
+        "Regular PII (name, email, contact info)",
+        "Sensitive PII (government IDs, credentials)",
+        "Financial transaction data",
+        "Trade secrets or intellectual property",
+        "GDPR Special Categories (health, biometric, etc.)"
+    ], aliases={
+        "Public/low sensitivity": "Public or low-sensitivity data",
+        "Internal confidential": "Internal confidential business data",
+        "Regular PII": "Regular PII (name, email, contact info)",
+        "PII with breach notification": "Sensitive PII (government IDs, credentials)",
+        "Financial data": "Financial transaction data",
+        "Trade secrets/IP": "Trade secrets or intellectual property",
+        "GDPR Special Categories": "GDPR Special Categories (health, biometric, etc.)"
+    }),
+    OptionEnum('data_third_party', YES_NO),
+    OptionEnum('stake_requestor_level', [
+        "Team or individual contributor",
+        "Department or business unit leadership",
+        "Multiple business unit heads",
+        "Board member or C-suite executive",
+        "Regulatory inquiry or audit finding",
+        "External audit finding"
+    ], aliases={
+        "Team/individual": "Team or individual contributor",
+        "Single BU leadership": "Department or business unit leadership",
+        "Multiple BU heads": "Multiple business unit heads",
+        "Board/C-suite": "Board member or C-suite executive",
+        "Regulatory inquiry": "Regulatory inquiry or audit finding"
+    }),
+    OptionSet('rep_harm_categories', [
+        "Customers/clients",
+        "Employees",
+        "Shareholders",
+        "Community/environment",
+        "Company reputation"
+    ], aliases={"Company reputation only": "Company reputation"}),
+    OptionSet('res_external_deps', [
+        "None",
+        "Third-party vendor required",
+        "Multiple system integrations needed"
+    ], aliases={
+        "Vendor/third-party": "Third-party vendor required",
+        "Multiple system integration": "Multiple system integrations needed"
+    })
+]}
+
+
+def encode_answers(data):
+    """Copy of a project dict with coded fields converted from labels to codes"""
+    return {key: ENUMS[key].code(value) if key in ENUMS else value for key, value in data.items()}
+
+
+def decode_answers(data):
+    """Copy of a project dict with coded fields converted from codes to labels"""
+    return {key: ENUMS[key].label(value) if key in ENUMS else value for key, value in data.items()}
+
+
+def sync_option_labels(cursor):
+    """Write the registry to the option_labels dictionary table"""
+    cursor.execute("DELETE FROM option_labels")
+    rows = []
+    for field, enum in ENUMS.items():
+        kind = 'mask' if isinstance(enum, OptionSet) else 'code'
+        for i, label in enumerate(enum.labels):
+            code = 1 << i if kind == 'mask' else i
+            rows.append((field, kind, code, label, 1))
+        for alias, label in enum.aliases.items():
+            i = enum.labels.index(label)
+            rows.append((field, kind, 1 << i if kind == 'mask' else i, alias, 0))
+    cursor.executemany(
+        "INSERT INTO option_labels (field, kind, code, label, canonical) VALUES (?, ?, ?, ?, ?)", rows
+    )
@@ -0,0 +1,360 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from utils.enums import ENUMS, OptionSet
+from utils.rubric import PRIORITY_LEVELS
+from utils.schema import PROJECT_DTYPES
+
+
+# Download metadata per export format
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'mime': 'text/csv'},
+    'xlsx': {'extension': 'xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'},
+    'arrow': {'extension': 'arrow', 'mime': 'application/vnd.apache.arrow.file'}
+}
+
+HEADER_COLOR = "4472C4"
+MAX_COLUMN_WIDTH = 50
+
+
+def write_projects_csv(db, handle, chunk_size=5000, progress_callback=None):
+    """Stream active projects to a text file handle as CSV. Returns the row count."""
+    rows = 0
+    for chunk in db.iter_projects(chunk_size):
+        chunk.to_csv(handle, header=rows == 0, index=False)
+        rows += len(chunk)
+        if progress_callback:
+            progress_callback(rows)
+    return rows
+
+
+def _column_widths(db, columns):
+    """Excel column widths from the longest stored value (and header) per column"""
+    lengths = db.get_text_lengths()
+    widths = {}
+    for column in columns:
+        length = lengths.get(column, 0)
+        enum = ENUMS.get(column)
+        if enum is not None:
+            # Stored as codes; the sheet shows labels
+            labels = [len(label) for label in enum.labels]
+            length = sum(labels) + len(labels) - 1 if isinstance(enum, OptionSet) else max(labels)
+        widths[column] = min(max(length, len(column)) + 2, MAX_COLUMN_WIDTH)
+    return widths
+
+
+def _summary_rows(stats):
+    """Metric/count rows for the Summary sheet, from Database.get_statistics()"""
+    by_status = stats['by_status'].set_index('status')['count']
+    by_priority = stats['by_priority'].set_index('priority')['count']
+    return [
+        ('Total Projects', stats['total']),
+        ('Submitted', int(by_status.get('Submitted', 0))),
+        ('Under Review', int(by_status.get('Under Review', 0))),
+        ('Approved', int(by_status.get('Approved', 0))),
+        ('Rejected', int(by_status.get('Rejected', 0))),
+        ('High Priority (Immediate)', int(by_priority.get(PRIORITY_LEVELS[0], 0))),
+        ('Medium Priority (Planned)', int(by_priority.get(PRIORITY_LEVELS[1], 0))),
+        ('Low Priority (Defer)', int(by_priority.get(PRIORITY_LEVELS[2], 0))),
+        ('Average Score', f"{stats['avg_score']:.1f}" if stats['avg_score'] is not None else "N/A")
+    ]
+
+
+def write_projects_excel(db, target, chunk_size=5000, progress_callback=None):
+    """Stream active projects to an .xlsx workbook (path or binary handle). Returns the row count.
+    
+    Uses openpyxl write-only mode, so rows go straight to the file instead
+    of being held as cell objects. Column widths come from one SQL
+    aggregate because write-only sheets need them before the first row.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+    
+    workbook = Workbook(write_only=True)
+    header_fill = PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    
+    def header_row(sheet, names):
+        cells = []
+        for name in names:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = Alignment(horizontal='center')
+            cells.append(cell)
+        return cells
+    
+    # Sheet 1: All Projects
+    sheet = workbook.create_sheet('All Projects')
+    rows = 0
+    columns = None
+    for chunk in db.iter_projects(chunk_size):
+        if columns is None:
+            columns = list(chunk.columns)
+            for i, width in enumerate(_column_widths(db, columns).values(), start=1):
+                sheet.column_dimensions[get_column_letter(i)].width = width
+            sheet.append(header_row(sheet, columns))
+        
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+        rows += len(chunk)
+        if progress_callback:
+            progress_callback(rows)
+    
+    if columns is not None:
+        sheet.auto_filter.ref = f"A1:{get_column_letter(len(columns))}{rows + 1}"
+    
+    # Sheet 2: Summary Statistics
+    summary = workbook.create_sheet('Summary')
+    summary_rows = _summary_rows(db.get_statistics())
+    summary.column_dimensions['A'].width = min(max(len(metric) for metric, _ in summary_rows) + 2, 30)
+    summary.column_dimensions['B'].width = 12
+    summary.append(header_row(summary, ['Metric', 'Count']))
+    for row in summary_rows:
+        summary.append(row)
+    
+    workbook.save(target)
+    return rows
+
+
+# Arrow type per PROJECT_DTYPES kind. Coded answers and repeated values are
+# dictionary-encoded so BI tools read them as categoricals.
+ARROW_TYPES = {
+    'enum': ('dictionary', 'int8'),
+    'category': ('dictionary', 'int32'),
+    'text': 'string',
+    'float64': 'float64',
+    'int8': 'int8',
+    'Int16': 'int16',
+    'int64': 'int64',
+    'Int64': 'int64',
+    'datetime': 'timestamp'
+}
+
+
+def _arrow_schema(columns, metadata=None):
+    """Fixed Arrow schema for projects columns, so every chunk writes the same types"""
+    import pyarrow as pa
+    
+    fields = []
+    for column in columns:
+        kind = ARROW_TYPES.get(PROJECT_DTYPES.get(column), 'string')
+        if isinstance(kind, tuple):
+            arrow_type = pa.dictionary(getattr(pa, kind[1])(), pa.string())
+        elif kind == 'timestamp':
+            arrow_type = pa.timestamp('s')
+        else:
+            arrow_type = getattr(pa, kind)()
+        fields.append(pa.field(column, arrow_type))
+    return pa.schema(fields, metadata=metadata)
+
+
+def _arrow_chunk(chunk, schema):
+    """Arrow table for one typed projects chunk"""
+    import pyarrow as pa
+    
+    chunk = chunk.copy()
+    for field in schema:
+        if pa.types.is_string(field.type) and isinstance(chunk[field.name].dtype, pd.CategoricalDtype):
+            # Short-text columns may come back as categories in some chunks only
+            chunk[field.name] = chunk[field.name].astype(object)
+    return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def write_projects_arrow(db, target, fmt='parquet', since_seq=None, chunk_size=5000, progress_callback=None):
+    """Write projects as a Parquet or Arrow IPC snapshot. Returns (rows, through_seq).
+    
+    Without since_seq this is a full snapshot of active projects; with it,
+    only rows changed after that change_seq (deleted ones included). The
+    returned through_seq is the watermark to pass for the next increment
+    and is also stored in the file metadata.
+    
+    Parquet is streamed one row group per chunk with column statistics, so
+    readers can skip row groups by score, date or change_seq. Arrow IPC
+    files need one dictionary per column, so chunks are combined before
+    writing; the result can be memory-mapped by readers.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    if fmt not in ('parquet', 'arrow'):
+        raise ValueError(f"Unknown snapshot format '{fmt}', expected 'parquet' or 'arrow'")
+    
+    rows = 0
+    through_seq = since_seq or 0
+    schema = None
+    writer = None
+    tables = []
+    try:
+        for chunk in db.iter_projects(chunk_size, since_seq=since_seq):
+            if schema is None:
+                schema = _arrow_schema(chunk.columns)
+                if fmt == 'parquet':
+                    writer = pq.ParquetWriter(target, schema, compression='zstd', write_statistics=True)
+            table = _arrow_chunk(chunk, schema)
+            if writer is not None:
+                writer.write_table(table)
+            else:
+                tables.append(table)
+            rows += len(chunk)
+            if chunk['change_seq'].notna().any():
+                through_seq = max(through_seq, int(chunk['change_seq'].max()))
+            if progress_callback:
+                progress_callback(rows)
+        
+        metadata = {
+            'since_seq': '' if since_seq is None else str(since_seq),
+            'through_seq': str(through_seq),
+            'exported_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if schema is None:
+            schema = _arrow_schema(list(PROJECT_DTYPES))
+        schema = schema.with_metadata(metadata)
+        
+        if fmt == 'parquet':
+            if writer is None:
+                writer = pq.ParquetWriter(target, schema, compression='zstd', write_statistics=True)
+            writer.add_key_value_metadata(metadata)
+        else:
+            table = pa.concat_tables(tables).unify_dictionaries() if tables else schema.empty_table()
+            with pa.OSFile(target, 'wb') as sink, pa.ipc.new_file(sink, schema) as ipc_writer:
+                ipc_writer.write_table(table.replace_schema_metadata(metadata))
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, through_seq
+
+
+# Background export jobs. Files are written to EXPORT_DIR by a small thread
+# pool so a large workbook never blocks a Streamlit script thread; the
+# export_jobs table tracks status and rows written so far are kept in
+# _progress (this process only) to avoid a write per chunk.
+EXPORT_DIR = 'exports'
+EXPORT_WORKERS = 2
+EXPORT_RETENTION_DAYS = 7
+
+_executor = None
+_executor_lock = threading.Lock()
+_progress = {}
+
+
+def _get_executor():
+    """Process-wide export worker pool, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+        return _executor
+
+
+def submit_export(db, fmt, requested_by, since_seq=None):
+    """Queue a background export of active projects and return its job ID.
+    
+    since_seq makes a Parquet/Arrow export incremental (see
+    write_projects_arrow). An unfinished job for the same format and
+    watermark is shared rather than duplicated; one left behind by a
+    restarted process is picked up again here. A finished file is reused
+    until the data changes (see Database.start_export_job).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {list(EXPORT_FORMATS)}")
+    if fmt in ('parquet', 'arrow'):
+        import pyarrow  # noqa: F401 - fail here rather than in the worker
+    elif since_seq is not None:
+        raise ValueError("Incremental exports are only available as Parquet or Arrow")
+    remove_old_exports()
+    
+    job_id, created = db.start_export_job(fmt, requested_by, since_seq)
+    if not created and db.get_export_job(job_id)['status'] == 'completed':
+        return job_id
+    with _executor_lock:
+        queued_here = job_id in _progress
+        _progress.setdefault(job_id, 0)
+    if not queued_here:
+        _get_executor().submit(run_export_job, db, job_id)
+    return job_id
+
+
+def run_export_job(db, job_id):
+    """Write the file for an export job, recording the outcome on the job"""
+    job = db.get_export_job(job_id)
+    fmt = job['format']
+    path = os.path.join(EXPORT_DIR, f"project_data_{job_id}.{EXPORT_FORMATS[fmt]['extension']}")
+    partial = f"{path}.part"
+    
+    def progress(rows):
+        _progress[job_id] = rows
+    
+    try:
+        db.update_export_job(job_id, status='running', error=None)
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        # Data version the file reflects; changes made while writing leave it
+        # behind the counter, so the next request rebuilds
+        start_seq = db.get_change_seq()
+        through_seq = start_seq
+        if fmt == 'csv':
+            with open(partial, 'w', newline='', encoding='utf-8') as handle:
+                rows = write_projects_csv(db, handle, progress_callback=progress)
+        elif fmt == 'xlsx':
+            rows = write_projects_excel(db, partial, progress_callback=progress)
+        else:
+            rows, through_seq = write_projects_arrow(db, partial, fmt, since_seq=job['since_seq'],
+                                                     progress_callback=progress)
+            through_seq = max(through_seq, start_seq)
+        os.replace(partial, path)
+        db.update_export_job(job_id, status='completed', processed=rows, file_path=path, through_seq=through_seq,
+                             finished_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        db.update_export_job(job_id, status='failed', error=str(e),
+                             finished_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    finally:
+        with _executor_lock:
+            _progress.pop(job_id, None)
+
+
+def job_progress(job):
+    """Fraction of rows written (0-1) for an export job dict"""
+    if job['status'] == 'completed':
+        return 1.0
+    rows = _progress.get(job['id'], job['processed'])
+    return min(rows / job['total'], 1.0) if job['total'] else 0.0
+
+
+def export_available(job):
+    """True if an export job finished and its file has not been removed"""
+    path = job.get('file_path')
+    return job['status'] == 'completed' and bool(path) and os.path.exists(path)
+
+
+def read_export(job):
+    """Finished export file as bytes, or None if it has been removed"""
+    if not export_available(job):
+        return None
+    with open(job['file_path'], 'rb') as handle:
+        return handle.read()
+
+
+def remove_old_exports(max_age_days=EXPORT_RETENTION_DAYS):
+    """Delete export files older than max_age_days"""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+
+def export_file_name(fmt, prefix='project_data'):
+    """Dated download file name for an export format"""
+    return f"{prefix}_{pd.Timestamp.now().strftime('%Y%m%d')}.{EXPORT_FORMATS[fmt]['extension']}"
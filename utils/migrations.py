@@ -0,0 +1,603 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on SQLite's own write lock
+    fcntl = None
+
+from utils.enums import ENUMS, OptionSet, sync_option_labels
+from utils.rubric import PRIORITY_LEVELS, SCORING_RULES, load_rubric, rubric_json
+from utils.scheduler import SLA_DEADLINE_SQL, SLA_ORDER
+
+
+def add_missing_columns(cursor, table, columns):
+    """Add columns that older database files were created without"""
+    # table_xinfo also lists generated columns
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})")}
+    for name, column_type in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+# project_stats keys never hold NULL (it would break the primary key), so
+# missing values are stored as '' and turned back into NULL when read
+_STATS_KEY = "COALESCE({row}.status, ''), COALESCE({row}.priority, ''), COALESCE({row}.department, ''), COALESCE({row}.deleted, 0)"
+
+_STATS_ADD = f"""
+            INSERT INTO project_stats (status, priority, department, deleted, project_count, score_sum, score_count)
+            VALUES ({_STATS_KEY}, 1, COALESCE({{row}}.total_score, 0), {{row}}.total_score IS NOT NULL)
+            ON CONFLICT (status, priority, department, deleted) DO UPDATE SET
+                project_count = project_count + 1,
+                score_sum = score_sum + excluded.score_sum,
+                score_count = score_count + excluded.score_count;
+"""
+
+_STATS_REMOVE = f"""
+            UPDATE project_stats SET
+                project_count = project_count - 1,
+                score_sum = score_sum - COALESCE({{row}}.total_score, 0),
+                score_count = score_count - ({{row}}.total_score IS NOT NULL)
+            WHERE (status, priority, department, deleted) = ({_STATS_KEY});
+            DELETE FROM project_stats
+            WHERE (status, priority, department, deleted) = ({_STATS_KEY}) AND project_count <= 0;
+"""
+
+
+def rebuild_project_stats(cursor):
+    """Recompute the project_stats rollup from scratch"""
+    cursor.execute("DELETE FROM project_stats")
+    cursor.execute('''
+        INSERT INTO project_stats (status, priority, department, deleted, project_count, score_sum, score_count)
+        SELECT COALESCE(status, ''), COALESCE(priority, ''), COALESCE(department, ''), COALESCE(deleted, 0),
+               COUNT(*), COALESCE(SUM(total_score), 0), COUNT(total_score)
+        FROM projects
+        GROUP BY 1, 2, 3, 4
+    ''')
+
+
+# Free-text columns indexed by projects_fts, with their BM25 weights
+SEARCH_COLUMNS = {
+    'project_title': 10.0,
+    'rep_headline': 5.0,
+    'op_process_name': 3.0,
+    'reg_citation': 3.0,
+    'stake_urgency': 1.0,
+    'co_notes': 2.0
+}
+
+# Review Queue priority order: IMMEDIATE first, then highest score within a
+# level. A single expression so one index serves both the sort and the keyset.
+PRIORITY_ORDER = (
+    f"(CASE priority WHEN '{PRIORITY_LEVELS[0]}' THEN 0 WHEN '{PRIORITY_LEVELS[1]}' THEN 1 ELSE 2 END"
+    f" * 1000 - COALESCE(total_score, 0))"
+)
+
+# Review Queue score order. Unscored projects sort last as -1, so the
+# keyset comparison never meets a NULL and pagination reaches them.
+SCORE_ORDER = "COALESCE(total_score, -1)"
+
+_FTS_ADD = f"""
+            INSERT INTO projects_fts (rowid, {', '.join(SEARCH_COLUMNS)})
+            VALUES (NEW.id, {', '.join(f'NEW.{col}' for col in SEARCH_COLUMNS)});
+"""
+
+# External-content FTS tables are told what to remove by passing the old values
+_FTS_REMOVE = f"""
+            INSERT INTO projects_fts (projects_fts, rowid, {', '.join(SEARCH_COLUMNS)})
+            VALUES ('delete', OLD.id, {', '.join(f'OLD.{col}' for col in SEARCH_COLUMNS)});
+"""
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text: every word, prefix-matched.
+    
+    Words are quoted, so operators and punctuation typed by users can never
+    cause a query syntax error. Returns None if there are no words.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def backfill_audit_events(cursor):
+    """Seed an empty audit log with the events still visible on existing projects"""
+    if cursor.execute("SELECT 1 FROM audit_events LIMIT 1").fetchone():
+        return
+    cursor.execute('''
+        INSERT INTO audit_events (event_date, username, action, project_id, details)
+        SELECT submission_date, requestor_name, 'Project Submitted', id, 'Department: ' || department
+        FROM projects
+    ''')
+    cursor.execute('''
+        INSERT INTO audit_events (event_date, username, action, project_id, details)
+        SELECT co_reviewed_date, co_reviewed_by, 'Scores Overridden', id, 'Compliance officer adjusted scoring'
+        FROM projects
+        WHERE co_reviewed_date IS NOT NULL AND COALESCE(
+            co_override_reg, co_override_rep, co_override_strat, co_override_op,
+            co_override_res, co_override_data, co_override_stake
+        ) IS NOT NULL
+    ''')
+    cursor.execute('''
+        INSERT INTO audit_events (event_date, username, action, project_id, details)
+        SELECT co_reviewed_date, co_reviewed_by, 'Project Reviewed', id, 'Decision: ' || co_decision
+        FROM projects
+        WHERE co_reviewed_date IS NOT NULL AND co_decision IS NOT NULL
+    ''')
+
+
+# Every insert or update of a project takes the next value of the 'projects'
+# counter as its change_seq, so "change_seq > N" selects exactly the rows
+# written since a reader last saw N (incremental exports)
+_CHANGE_BUMP = """
+            UPDATE change_counter SET value = value + 1 WHERE name = 'projects';
+            UPDATE projects SET change_seq = (SELECT value FROM change_counter WHERE name = 'projects')
+            WHERE id = NEW.id;
+"""
+
+
+def infer_legacy_op_blocker(cursor):
+    """Fill op_blocker for rows saved before it was stored.
+    
+    Uses the scoring rule in force when they were saved, where the scope
+    bonus keyed on a label the form never offered, so the blocker point is
+    whatever op_score holds above the efficiency band.
+    """
+    cursor.execute('''
+        UPDATE projects SET op_blocker = CASE WHEN op_score > MIN(5,
+            CASE
+                WHEN op_efficiency_gain >= 30 THEN 5
+                WHEN op_efficiency_gain >= 20 THEN 4
+                WHEN op_efficiency_gain >= 10 THEN 3
+                WHEN op_efficiency_gain >= 5 THEN 2
+                ELSE 1
+            END + (op_scope IS '3+ business units')
+        ) THEN 'YES' ELSE 'NO' END
+        WHERE op_blocker IS NULL AND op_score IS NOT NULL
+    ''')
+
+
+def _migration_code(enum, value):
+    """Code for a stored answer, leaving out labels the registry does not know.
+    
+    Returns (code, known): an unknown single answer becomes NULL (scored as
+    the rubric default, as the original scorer did) and unknown labels in a
+    multi-select are dropped from its mask.
+    """
+    try:
+        return enum.code(value), True
+    except ValueError:
+        pass
+    if isinstance(enum, OptionSet) and isinstance(value, str):
+        known = []
+        for label in value.split(','):
+            try:
+                enum.bit(label.strip())
+                known.append(label)
+            except ValueError:
+                pass
+        return enum.code(known), False
+    return None, False
+
+
+def encode_option_columns(cursor):
+    """Convert option answer columns from label text to integer codes.
+    
+    Each column is rebuilt as INTEGER under the same name. A stored value
+    that matches no label or alias must not block the upgrade. It is stored
+    without its unknown labels (see _migration_code) and recorded, with the
+    original text, in audit_events against each project that held it.
+    """
+    types = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(projects)")}
+    migrated_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for field, enum in ENUMS.items():
+        if field not in types or types[field].upper() == 'INTEGER':
+            continue
+        
+        values = [row[0] for row in cursor.execute(f"SELECT DISTINCT {field} FROM projects WHERE {field} IS NOT NULL")]
+        codes = {}
+        for value in values:
+            codes[value], known = _migration_code(enum, value)
+            if not known:
+                cursor.execute(f'''
+                    INSERT INTO audit_events (event_date, username, action, project_id, details, changes)
+                    SELECT ?, 'system', 'Unknown Option Replaced', id, ?, ? FROM projects WHERE {field} = ?
+                ''', (migrated_date, f"{value!r} is not an option for {field}",
+                      json.dumps({field: [value, enum.label(codes[value])]}), value))
+        cursor.execute("CREATE TEMP TABLE option_codes (value PRIMARY KEY, code INTEGER)")
+        cursor.executemany("INSERT INTO option_codes (value, code) VALUES (?, ?)", list(codes.items()))
+        
+        cursor.execute(f"ALTER TABLE projects ADD COLUMN {field}_code INTEGER")
+        cursor.execute(f'''
+            UPDATE projects SET {field}_code = (SELECT code FROM option_codes WHERE value = projects.{field})
+            WHERE {field} IS NOT NULL
+        ''')
+        cursor.execute("DROP TABLE temp.option_codes")
+        cursor.execute(f"ALTER TABLE projects DROP COLUMN {field}")
+        cursor.execute(f"ALTER TABLE projects RENAME COLUMN {field}_code TO {field}")
+
+
+def publish_current_rubric(cursor):
+    """Record each rubric's scoring rules and publish the active one under the current rules.
+    
+    Rubrics with option keys in wording the form never used (enum aliases)
+    were written for the original scorer and keep scoring rules 1; those
+    keyed on form labels only were already scored under the current rules.
+    If the active rubric is on older rules, a copy with its option points
+    matched to the form answers becomes the next version. Stored scores
+    keep the meaning of the version they name until they are re-scored.
+    """
+    add_missing_columns(cursor, 'scoring_rubrics', {'rules': 'INTEGER NOT NULL DEFAULT 1'})
+    for version, option_maps in cursor.execute("SELECT version, option_maps FROM scoring_rubrics").fetchall():
+        aliased = any(label in ENUMS[name].aliases
+                      for name, spec in json.loads(option_maps).items() for label in spec['points'])
+        if not aliased:
+            cursor.execute("UPDATE scoring_rubrics SET rules = ? WHERE version = ?", (SCORING_RULES, version))
+    
+    latest = cursor.execute('''
+        SELECT version, weights, thresholds, option_maps, rules FROM scoring_rubrics
+        ORDER BY version DESC LIMIT 1
+    ''').fetchone()
+    if latest is None or latest[4] >= SCORING_RULES:
+        return
+    version, weights, thresholds, option_maps, _ = latest
+    corrected = load_rubric(version, weights, thresholds, option_maps, SCORING_RULES).to_definition()
+    cursor.execute('''
+        INSERT INTO scoring_rubrics (weights, thresholds, option_maps, rules, created_by, created_date, notes)
+        VALUES (?, ?, ?, ?, 'system', ?, ?)
+    ''', (*rubric_json(json.loads(weights), json.loads(thresholds), corrected['option_maps']), SCORING_RULES,
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+          f"Version {version} with option points, scope bonus and dependency penalty matched to the form answers"))
+
+
+# Schema migrations, applied in order and recorded in schema_version.
+# Each step must be idempotent so a database created by an older release
+# (or half-migrated by a crash) can always be brought up to date.
+# A step is a SQL string or a function taking a cursor.
+MIGRATIONS = [
+    (1, "Add rubric_version and op_blocker columns", [
+        lambda c: add_missing_columns(c, 'projects', {
+            'rubric_version': 'INTEGER',
+            'op_blocker': 'TEXT'
+        })
+    ]),
+    (2, "Add soft-delete flag", [
+        lambda c: add_missing_columns(c, 'projects', {
+            'deleted': 'INTEGER NOT NULL DEFAULT 0'
+        })
+    ]),
+    (3, "Index projects for list, filter and statistics queries", [
+        # get_projects(): newest first, with or without a status filter
+        "CREATE INDEX IF NOT EXISTS idx_projects_submission ON projects (submission_date)",
+        "CREATE INDEX IF NOT EXISTS idx_projects_status_submission ON projects (status, submission_date)",
+        # get_statistics(): counts by priority and the top Submitted projects by score
+        "CREATE INDEX IF NOT EXISTS idx_projects_priority_status_score ON projects (priority, status, total_score)",
+        # get_statistics(): average score by department (covering)
+        "CREATE INDEX IF NOT EXISTS idx_projects_department_score ON projects (department, total_score)",
+        # Review Queue / Dashboard: active projects only, archive rows are never visited
+        """CREATE INDEX IF NOT EXISTS idx_projects_active_submission
+           ON projects (submission_date) WHERE deleted = 0""",
+        """CREATE INDEX IF NOT EXISTS idx_projects_active_status_submission
+           ON projects (status, submission_date) WHERE deleted = 0""",
+        """CREATE INDEX IF NOT EXISTS idx_projects_active_queue
+           ON projects (department, priority, status) WHERE deleted = 0""",
+        "ANALYZE projects"
+    ]),
+    (4, "Add project_stats rollup maintained by triggers", [
+        '''
+        CREATE TABLE IF NOT EXISTS project_stats (
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            department TEXT NOT NULL,
+            deleted INTEGER NOT NULL,
+            project_count INTEGER NOT NULL DEFAULT 0,
+            score_sum REAL NOT NULL DEFAULT 0,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, priority, department, deleted)
+        ) WITHOUT ROWID
+        ''',
+        "DROP TRIGGER IF EXISTS trg_project_stats_insert",
+        "DROP TRIGGER IF EXISTS trg_project_stats_delete",
+        "DROP TRIGGER IF EXISTS trg_project_stats_update",
+        f"""
+        CREATE TRIGGER trg_project_stats_insert AFTER INSERT ON projects
+        BEGIN
+            {_STATS_ADD.format(row='NEW')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_project_stats_delete AFTER DELETE ON projects
+        BEGIN
+            {_STATS_REMOVE.format(row='OLD')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_project_stats_update
+        AFTER UPDATE OF status, priority, department, deleted, total_score ON projects
+        BEGIN
+            {_STATS_REMOVE.format(row='OLD')}
+            {_STATS_ADD.format(row='NEW')}
+        END
+        """,
+        rebuild_project_stats
+    ]),
+    (5, "Add append-only audit_events log", [
+        '''
+        CREATE TABLE IF NOT EXISTS audit_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_date TEXT NOT NULL,
+            username TEXT,
+            action TEXT NOT NULL,
+            project_id INTEGER,
+            details TEXT,
+            changes TEXT
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_audit_date ON audit_events (event_date)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_user_date ON audit_events (username, event_date)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_action_date ON audit_events (action, event_date)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_project_date ON audit_events (project_id, event_date)",
+        # Events are never changed once written
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_audit_events_no_update BEFORE UPDATE ON audit_events
+        BEGIN
+            SELECT RAISE(ABORT, 'audit_events is append-only');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_audit_events_no_delete BEFORE DELETE ON audit_events
+        BEGIN
+            SELECT RAISE(ABORT, 'audit_events is append-only');
+        END
+        ''',
+        backfill_audit_events
+    ]),
+    (6, "Add soft-delete archive columns and partial indexes", [
+        lambda c: add_missing_columns(c, 'projects', {
+            'deleted_by': 'TEXT',
+            'deleted_date': 'TEXT',
+            'deletion_reason': 'TEXT'
+        }),
+        # Statistics come from project_stats now; active-only versions replace these
+        "DROP INDEX IF EXISTS idx_projects_priority_status_score",
+        "DROP INDEX IF EXISTS idx_projects_department_score",
+        """CREATE INDEX IF NOT EXISTS idx_projects_active_priority_score
+           ON projects (priority, status, total_score) WHERE deleted = 0""",
+        # Archive listing (get_deleted_projects)
+        """CREATE INDEX IF NOT EXISTS idx_projects_archive
+           ON projects (deleted_date) WHERE deleted = 1""",
+        "ANALYZE projects"
+    ]),
+    (7, "Add projects_fts full-text index", [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+            {', '.join(SEARCH_COLUMNS)},
+            content='projects', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        "DROP TRIGGER IF EXISTS trg_projects_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_projects_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_projects_fts_update",
+        f"""
+        CREATE TRIGGER trg_projects_fts_insert AFTER INSERT ON projects
+        BEGIN
+            {_FTS_ADD}
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_projects_fts_delete AFTER DELETE ON projects
+        BEGIN
+            {_FTS_REMOVE}
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_projects_fts_update AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON projects
+        BEGIN
+            {_FTS_REMOVE}
+            {_FTS_ADD}
+        END
+        """,
+        "INSERT INTO projects_fts (projects_fts) VALUES ('rebuild')"
+    ]),
+    (8, "Store option answers as integer codes", [
+        """
+        CREATE TABLE IF NOT EXISTS option_labels (
+            field TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            code INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            canonical INTEGER NOT NULL,
+            PRIMARY KEY (field, label)
+        )
+        """,
+        sync_option_labels,
+        infer_legacy_op_blocker,
+        encode_option_columns
+    ]),
+    (9, "Add export_jobs for background exports", [
+        """
+        CREATE TABLE IF NOT EXISTS export_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            format TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            total INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0,
+            file_path TEXT,
+            requested_by TEXT,
+            requested_date TEXT NOT NULL,
+            finished_date TEXT,
+            error TEXT
+        )
+        """,
+        # start_export_job(): find an unfinished job for the same format
+        "CREATE INDEX IF NOT EXISTS idx_export_jobs_status ON export_jobs (status, format)"
+    ]),
+    (10, "Add change_seq watermark for incremental exports", [
+        lambda c: add_missing_columns(c, 'projects', {'change_seq': 'INTEGER'}),
+        lambda c: add_missing_columns(c, 'export_jobs', {'since_seq': 'INTEGER', 'through_seq': 'INTEGER'}),
+        '''
+        CREATE TABLE IF NOT EXISTS change_counter (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        ) WITHOUT ROWID
+        ''',
+        "DROP TRIGGER IF EXISTS trg_projects_change_insert",
+        "DROP TRIGGER IF EXISTS trg_projects_change_update",
+        # Existing rows are numbered in id order
+        "UPDATE projects SET change_seq = id WHERE change_seq IS NULL",
+        '''
+        INSERT INTO change_counter (name, value)
+        SELECT 'projects', COALESCE(MAX(change_seq), 0) FROM projects WHERE true
+        ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)
+        ''',
+        f"""
+        CREATE TRIGGER trg_projects_change_insert AFTER INSERT ON projects
+        BEGIN
+            {_CHANGE_BUMP}
+        END
+        """,
+        # The WHEN clause skips the trigger's own change_seq update
+        f"""
+        CREATE TRIGGER trg_projects_change_update AFTER UPDATE ON projects
+        WHEN NEW.change_seq IS OLD.change_seq
+        BEGIN
+            {_CHANGE_BUMP}
+        END
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_projects_change_seq ON projects (change_seq)"
+    ]),
+    (11, "Index the Review Queue sort orders", [
+        # get_projects(sort='score')
+        "CREATE INDEX IF NOT EXISTS idx_projects_active_score ON projects (total_score) WHERE deleted = 0",
+        # get_projects(sort='priority')
+        f"""CREATE INDEX IF NOT EXISTS idx_projects_active_priority_order
+           ON projects ({PRIORITY_ORDER}) WHERE deleted = 0""",
+        "ANALYZE projects"
+    ]),
+    (12, "Add project assignee for review reassignment", [
+        lambda c: add_missing_columns(c, 'projects', {'assigned_to': 'TEXT'})
+    ]),
+    (13, "Add review_leases for claiming projects", [
+        '''
+        CREATE TABLE IF NOT EXISTS review_leases (
+            project_id INTEGER PRIMARY KEY REFERENCES projects (id),
+            username TEXT NOT NULL,
+            claimed_date TEXT NOT NULL,
+            expires_date TEXT NOT NULL
+        )
+        ''',
+        # claim_next(): expired lease cleanup
+        "CREATE INDEX IF NOT EXISTS idx_review_leases_expires ON review_leases (expires_date)"
+    ]),
+    (14, "Add sla_deadline for SLA scheduling", [
+        # Virtual generated column: always follows priority, status and submission_date
+        lambda c: add_missing_columns(c, 'projects', {
+            'sla_deadline': f"TEXT GENERATED ALWAYS AS {SLA_DEADLINE_SQL} VIRTUAL"
+        }),
+        # next_due(), SLA counts and the Review Queue 'due' sort
+        f"""CREATE INDEX IF NOT EXISTS idx_projects_active_due
+           ON projects ({SLA_ORDER}) WHERE deleted = 0""",
+        "ANALYZE projects"
+    ]),
+    (15, "Version scoring rules per rubric", [
+        publish_current_rubric
+    ]),
+    (16, "Index the NULL-safe Review Queue score order", [
+        # get_projects(sort='score')
+        f"""CREATE INDEX IF NOT EXISTS idx_projects_active_score_order
+           ON projects ({SCORE_ORDER}) WHERE deleted = 0""",
+        "ANALYZE projects"
+    ])
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+def current_version(cursor):
+    """Highest applied migration version (0 for a new database)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_date TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def run_migrations(conn):
+    """Apply pending migrations, each in its own transaction. Returns the versions applied."""
+    c = conn.cursor()
+    applied = []
+    
+    for version, description, steps in MIGRATIONS:
+        if version <= current_version(c):
+            continue
+        with conn:
+            for step in steps:
+                if callable(step):
+                    step(c)
+                else:
+                    c.execute(step)
+            c.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description, applied_date) VALUES (?, ?, ?)",
+                (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+        applied.append(version)
+    
+    return applied
+
+
+def schema_is_current(cursor):
+    """True if every migration has been applied (read-only check)"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    if cursor.fetchone() is None:
+        return False
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0] >= SCHEMA_VERSION
+
+
+@contextmanager
+def schema_lock(db_name):
+    """Exclusive lock on <db_name>.lock, held by one process at a time while it sets up the schema"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{db_name}.lock", 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def ensure_schema(conn, db_name, create_tables):
+    """Create tables and apply migrations once per process and database file.
+    
+    create_tables(cursor) runs before the migrations. Processes sharing the
+    file take turns through schema_lock, and once the schema is current the
+    check is a single read, so new sessions and replicas write nothing.
+    Returns the migration versions applied.
+    """
+    key = os.path.abspath(db_name)
+    with _migrated_lock:
+        if key in _migrated:
+            return []
+        applied = []
+        with schema_lock(db_name):
+            c = conn.cursor()
+            if not schema_is_current(c):
+                create_tables(c)
+                applied = run_migrations(conn)
+        _migrated.add(key)
+    return applied
@@ -0,0 +1,298 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
+
+from utils.enums import ENUMS
+
+
+SECTIONS = ('reg', 'rep', 'strat', 'op', 'res', 'data', 'stake')
+
+PRIORITY_LEVELS = ('🔴 IMMEDIATE', '🟡 PLANNED', '⚪ DEFER')
+
+# Scoring rules revision new rubrics are published under. Revision 1 is
+# the original scorer, which compared answers with rubric keys and rule
+# labels as exact strings: option points keyed by earlier wording (now
+# enum aliases) never matched a form answer, the scope bonus never applied
+# and only "Multiple system integrations needed" triggered the dependency
+# penalty. Revision 2 matches on option codes. A stored rubric keeps its
+# revision, so the scores it produced can always be reproduced.
+SCORING_RULES = 2
+
+# Built-in rubric for new rubric versions
+DEFAULT_WEIGHTS = {
+    'reg': 0.25,
+    'rep': 0.20,
+    'strat': 0.15,
+    'op': 0.15,
+    'res': 0.10,
+    'data': 0.10,
+    'stake': 0.05
+}
+
+DEFAULT_THRESHOLDS = {
+    'IMMEDIATE': 70,
+    'PLANNED': 50
+}
+
+DEFAULT_OPTION_MAPS = {
+    'reg_deadline': {
+        'default': 1,
+        'points': {
+            "<3 months": 5,
+            "3-6 months": 4,
+            "6-12 months": 3,
+            ">12 months": 2,
+            "No specific deadline": 2
+        }
+    },
+    'rep_risk_level': {
+        'default': 1,
+        'points': {
+            "1 - Minimal risk": 1,
+            "2 - Low risk, proactive measure": 2,
+            "3 - Moderate risk, potential exposure": 3,
+            "4 - High risk, known vulnerability": 4,
+            "5 - Critical risk, active issue": 5
+        }
+    },
+    'strat_document': {
+        'default': 1,
+        'points': {
+            "CEO/Board strategic plan": 5,
+            "Division/BU annual strategy": 4,
+            "Departmental objectives": 3,
+            "Operational improvement": 2,
+            "Not in strategic documentation": 1
+        }
+    },
+    'res_approach': {
+        'default': 3,
+        'points': {
+            "Use existing tool/platform with configuration only": 5,
+            "Extend or integrate with existing platform": 4,
+            "Deploy new tool with standard implementation": 3,
+            "Custom development required": 2,
+            "Major system overhaul or multiple system integration": 1
+        }
+    },
+    'data_type': {
+        'default': 1,
+        'points': {
+            "GDPR Special Categories (health, biometric, etc.)": 5,
+            "Financial transaction data": 5,
+            "Trade secrets or intellectual property": 5,
+            "Sensitive PII (government IDs, credentials)": 4,
+            "Regular PII (name, email, contact info)": 3,
+            "Internal confidential business data": 2,
+            "Public or low-sensitivity data": 1
+        }
+    },
+    'stake_requestor_level': {
+        'default': 1,
+        'points': {
+            "External audit finding": 5,
+            "Regulatory inquiry or audit finding": 5,
+            "Board member or C-suite executive": 4,
+            "Multiple business unit heads": 3,
+            "Department or business unit leadership": 2,
+            "Team or individual contributor": 1
+        }
+    }
+}
+
+
+# Option maps of rubric version 1 as first published (scoring rules 1)
+ORIGINAL_OPTION_MAPS = {
+    **DEFAULT_OPTION_MAPS,
+    'strat_document': {
+        'default': 1,
+        'points': {
+            "CEO/Board strategic plan": 5,
+            "Division/BU annual strategy": 4,
+            "Departmental objectives": 3,
+            "Operational improvement": 2,
+            "Not in strategic docs": 1
+        }
+    },
+    'res_approach': {
+        'default': 3,
+        'points': {
+            "Existing tool/platform, configuration only": 5,
+            "Extend existing platform": 4,
+            "New tool, standard implementation": 3,
+            "Custom development": 2,
+            "Major system overhaul": 1
+        }
+    },
+    'data_type': {
+        'default': 1,
+        'points': {
+            "GDPR Special Categories": 5,
+            "Financial data": 5,
+            "Trade secrets/IP": 5,
+            "PII with breach notification": 4,
+            "Regular PII": 3,
+            "Internal confidential": 2,
+            "Public/low sensitivity": 1
+        }
+    },
+    'stake_requestor_level': {
+        'default': 1,
+        'points': {
+            "External audit finding": 5,
+            "Regulatory inquiry": 5,
+            "Board/C-suite": 4,
+            "Multiple BU heads": 3,
+            "Single BU leadership": 2,
+            "Team/individual": 1
+        }
+    }
+}
+
+
+def _frozen_array(values):
+    """Read-only float64 array"""
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+class OptionTable:
+    """Compiled option-to-points map for one answer field, indexed by option code.
+    
+    `points` holds one entry per option code (see utils.enums) plus the
+    default in the last slot, so code -1 (missing answer) resolves to the
+    default. Options the rubric does not list also score the default.
+    With exact_labels (scoring rules 1) only keys spelled like the stored
+    answers score; alias keys are kept out as the original scorer never
+    matched them.
+    """
+    __slots__ = ('enum', 'labels', 'points', 'default')
+    
+    def __init__(self, enum, points, default, exact_labels=False):
+        self.enum = enum
+        self.default = float(default)
+        values = [self.default] * (len(enum.labels) + 1)
+        labels = []
+        for label, value in points.items():
+            if exact_labels and label not in enum.labels:
+                enum.code(label)  # still reject unknown keys
+                continue
+            code = enum.code(label)
+            values[code] = float(value)
+            labels.append(enum.labels[code])
+        self.labels = tuple(labels)
+        self.points = _frozen_array(values)
+    
+    def get(self, value):
+        """Points for a single answer (label or code)"""
+        code = self.enum.code(value)
+        return self.points[-1 if code is None else code]
+    
+    def take(self, codes):
+        """Points for an array of option codes (-1 for missing)"""
+        return self.points[codes]
+
+
+@dataclass(frozen=True, eq=False)
+class Rubric:
+    """Immutable, compiled scoring rubric for one version"""
+    version: int
+    weights: MappingProxyType
+    weight_vector: np.ndarray
+    immediate_threshold: float
+    planned_threshold: float
+    options: MappingProxyType
+    rules: int = SCORING_RULES
+    
+    def get_priority(self, total_score):
+        """Priority level for a total score"""
+        if total_score >= self.immediate_threshold:
+            return PRIORITY_LEVELS[0]
+        elif total_score >= self.planned_threshold:
+            return PRIORITY_LEVELS[1]
+        else:
+            return PRIORITY_LEVELS[2]
+    
+    def to_definition(self):
+        """Plain dict form, as stored in scoring_rubrics"""
+        return {
+            'weights': dict(self.weights),
+            'thresholds': {
+                'IMMEDIATE': self.immediate_threshold,
+                'PLANNED': self.planned_threshold
+            },
+            'option_maps': {
+                name: {
+                    'default': table.default,
+                    'points': {label: float(table.points[table.enum.code(label)]) for label in table.labels}
+                }
+                for name, table in self.options.items()
+            }
+        }
+
+
+def validate_rubric(weights, thresholds, option_maps):
+    """Raise ValueError if a rubric definition is incomplete or inconsistent"""
+    missing = [s for s in SECTIONS if s not in weights]
+    if missing:
+        raise ValueError(f"Missing weights for: {', '.join(missing)}")
+    if any(float(w) < 0 for w in weights.values()):
+        raise ValueError("Weights must not be negative")
+    if abs(sum(float(weights[s]) for s in SECTIONS) - 1.0) > 1e-6:
+        raise ValueError("Weights must add up to 100%")
+    if float(thresholds['IMMEDIATE']) <= float(thresholds['PLANNED']):
+        raise ValueError("IMMEDIATE threshold must be above PLANNED threshold")
+    missing = [name for name in DEFAULT_OPTION_MAPS if name not in option_maps]
+    if missing:
+        raise ValueError(f"Missing option maps for: {', '.join(missing)}")
+    for name, spec in option_maps.items():
+        if name not in ENUMS:
+            raise ValueError(f"Unknown option map '{name}'")
+        if 'points' not in spec or 'default' not in spec:
+            raise ValueError(f"Option map '{name}' needs 'points' and 'default'")
+        for label in spec['points']:
+            ENUMS[name].code(label)
+
+
+@lru_cache(maxsize=32)
+def load_rubric(version, weights_json, thresholds_json, option_maps_json, rules=SCORING_RULES):
+    """Compile a stored rubric row; cached per version and definition"""
+    weights = json.loads(weights_json)
+    thresholds = json.loads(thresholds_json)
+    option_maps = json.loads(option_maps_json)
+    validate_rubric(weights, thresholds, option_maps)
+    
+    return Rubric(
+        version=version,
+        weights=MappingProxyType({s: float(weights[s]) for s in SECTIONS}),
+        weight_vector=_frozen_array([weights[s] for s in SECTIONS]),
+        immediate_threshold=float(thresholds['IMMEDIATE']),
+        planned_threshold=float(thresholds['PLANNED']),
+        options=MappingProxyType({
+            name: OptionTable(ENUMS[name], spec['points'], spec['default'], exact_labels=rules < 2)
+            for name, spec in option_maps.items()
+        }),
+        rules=rules
+    )
+
+
+def rubric_json(weights, thresholds, option_maps):
+    """Serialize a rubric definition to the three JSON columns"""
+    return (
+        json.dumps(weights, sort_keys=True),
+        json.dumps(thresholds, sort_keys=True),
+        json.dumps(option_maps, sort_keys=True, ensure_ascii=False)
+    )
+
+
+@lru_cache(maxsize=None)
+def default_rubric():
+    """Built-in rubric under the current scoring rules, used when no database rubric is given.
+    
+    A new database publishes it as version 2, after the original version 1.
+    """
+    return load_rubric(2, *rubric_json(DEFAULT_WEIGHTS, DEFAULT_THRESHOLDS, DEFAULT_OPTION_MAPS))
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from utils.rubric import PRIORITY_LEVELS
+
+
+# Statuses that still need a reviewer; the SLA clock only runs for these
+QUEUE_STATUSES = ('Submitted', 'Under Review')
+
+# Review SLA per priority as (amount, unit), from the Expected Action column
+# of the Admin threshold table. DEFER has no deadline.
+SLA_RULES = {
+    PRIORITY_LEVELS[0]: (5, 'business_days'),
+    PRIORITY_LEVELS[1]: (30, 'days')
+}
+
+# Open projects due within this many hours are at risk of breaching
+AT_RISK_HOURS = 48
+
+# Sorts projects without a deadline after every real one
+NO_DEADLINE = '9999-12-31 23:59:59'
+
+
+def sla_deadline(priority, submission_date, status=QUEUE_STATUSES[0]):
+    """SLA deadline ("YYYY-MM-DD HH:MM:SS") for one project, or None if none applies.
+    
+    Business days skip weekends; a weekend submission counts from the
+    Friday before. Matches SLA_DEADLINE_SQL, which fills projects.sla_deadline.
+    """
+    rule = SLA_RULES.get(priority)
+    if rule is None or status not in QUEUE_STATUSES or submission_date is None:
+        return None
+    submitted = pd.Timestamp(submission_date)
+    amount, unit = rule
+    if unit == 'days':
+        due = submitted + pd.Timedelta(days=amount)
+    else:
+        due_day = np.busday_offset(np.datetime64(submitted.date()), amount, roll='backward')
+        due = pd.Timestamp(due_day) + (submitted - submitted.normalize())
+    return due.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def sla_deadline_sql(priority='priority', submitted='submission_date', status='status'):
+    """SQL expression computing sla_deadline() from a row's columns"""
+    # Monday = 0 ... Sunday = 6; weekends are moved back to Friday
+    weekday = f"((CAST(strftime('%w', {submitted}) AS INTEGER) + 6) % 7)"
+    cases = []
+    for level, (amount, unit) in SLA_RULES.items():
+        if unit == 'days':
+            days = str(amount)
+        else:
+            days = f"({amount} + 2 * ((MIN({weekday}, 4) + {amount}) / 5) - MAX({weekday} - 4, 0))"
+        cases.append(f"WHEN '{level}' THEN datetime({submitted}, '+' || {days} || ' days')")
+    open_statuses = ', '.join(f"'{s}'" for s in QUEUE_STATUSES)
+    return f"(CASE WHEN {status} IN ({open_statuses}) THEN CASE {priority} {' '.join(cases)} END END)"
+
+
+SLA_DEADLINE_SQL = sla_deadline_sql()
+
+# Deadline order with undated projects last; indexed by migration 14
+SLA_ORDER = f"COALESCE(sla_deadline, '{NO_DEADLINE}')"
+
+
+def sla_status(deadlines, now=None, at_risk_hours=AT_RISK_HOURS):
+    """'Overdue', 'At risk' or '' for an array of deadlines (missing deadlines give '')"""
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    deadlines = pd.to_datetime(pd.Series(deadlines), errors='coerce').to_numpy()
+    status = np.full(len(deadlines), '', dtype=object)
+    status[deadlines < np.datetime64(now + pd.Timedelta(hours=at_risk_hours))] = 'At risk'
+    status[deadlines < np.datetime64(now)] = 'Overdue'
+    return status
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from utils.enums import ENUMS
+
+
+# Compact pandas dtypes for projects columns. Columns not listed stay object dtype.
+#   enum     - option answers stored as codes, decoded to a Categorical of labels
+#   category - other heavily repeated values
+#   text     - free text; category when at most half the values are distinct
+#              (blank answers, copied boilerplate), otherwise left as object
+#   float64  - scores and numeric answers, kept at the stored REAL precision so
+#              values near a threshold compare as they do in SQL
+#   int8     - 0/1 flags (missing treated as 0)
+#   Int16    - small nullable integers
+#   datetime - "YYYY-MM-DD HH:MM:SS" text, parsed to datetime64
+PROJECT_DTYPES = {
+    'id': 'int64',
+    
+    # Request details
+    'project_title': 'text',
+    'requestor_name': 'category',
+    'requestor_email': 'category',
+    'department': 'category',
+    'submission_date': 'datetime',
+    'status': 'category',
+    
+    # Section answers
+    'reg_required': 'enum',
+    'reg_citation': 'text',
+    'reg_deadline': 'enum',
+    'reg_enforcement': 'enum',
+    'rep_headline': 'text',
+    'rep_risk_level': 'enum',
+    'rep_harm_categories': 'enum',
+    'rep_liability': 'enum',
+    'strat_document': 'enum',
+    'strat_sponsor': 'enum',
+    'strat_budget': 'enum',
+    'op_process_name': 'text',
+    'op_current_time': 'float64',
+    'op_projected_time': 'float64',
+    'op_efficiency_gain': 'float64',
+    'op_scope': 'enum',
+    'op_blocker': 'enum',
+    'res_approach': 'enum',
+    'res_total_hours': 'float64',
+    'res_external_deps': 'enum',
+    'data_type': 'enum',
+    'data_third_party': 'enum',
+    'data_volume': 'category',
+    'stake_requestor_level': 'enum',
+    'stake_urgency': 'text',
+    
+    # Scores
+    'reg_score': 'float64',
+    'rep_score': 'float64',
+    'strat_score': 'float64',
+    'op_score': 'float64',
+    'res_score': 'float64',
+    'data_score': 'float64',
+    'stake_score': 'float64',
+    'total_score': 'float64',
+    'priority': 'category',
+    'rubric_version': 'Int16',
+    'sla_deadline': 'datetime',
+    
+    # Compliance review
+    'co_reviewed_by': 'category',
+    'co_reviewed_date': 'datetime',
+    'co_override_reg': 'float64',
+    'co_override_rep': 'float64',
+    'co_override_strat': 'float64',
+    'co_override_op': 'float64',
+    'co_override_res': 'float64',
+    'co_override_data': 'float64',
+    'co_override_stake': 'float64',
+    'co_final_score': 'float64',
+    'co_decision': 'category',
+    'co_notes': 'text',
+    'assigned_to': 'category',
+    
+    # Flags and archive
+    'red_flags': 'category',
+    'auto_reject': 'int8',
+    'deleted': 'int8',
+    'deleted_by': 'category',
+    'deleted_date': 'datetime',
+    'deletion_reason': 'text',
+    'change_seq': 'Int64'
+}
+
+
+def apply_dtypes(df, dtypes=PROJECT_DTYPES):
+    """Convert the columns of df that appear in dtypes, in place, and return it"""
+    for column in df.columns.intersection(list(dtypes)):
+        kind = dtypes[column]
+        values = df[column]
+        if kind == 'enum':
+            df[column] = ENUMS[column].decode(values)
+        elif kind == 'category':
+            df[column] = values.astype('category')
+        elif kind == 'text':
+            if values.nunique() <= len(values) // 2:
+                df[column] = values.astype('category')
+        elif kind == 'datetime':
+            df[column] = pd.to_datetime(values, format='ISO8601', errors='coerce')
+        elif kind == 'int8':
+            df[column] = pd.to_numeric(values, errors='coerce').fillna(0).astype(np.int8)
+        else:
+            df[column] = pd.to_numeric(values, errors='coerce').astype(kind)
+    return df
+
+
+def read_frame(query, conn, params=None, dtypes=PROJECT_DTYPES):
+    """pd.read_sql_query with compact column dtypes applied"""
+    return apply_dtypes(pd.read_sql_query(query, conn, params=params), dtypes)
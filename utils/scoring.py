@@ -1,19 +1,18 @@
-def calculate_regulatory_score(reg_required, reg_deadline, reg_enforcement):
+import numpy as np
+import pandas as pd
+
+from utils.enums import ENUMS
+from utils.rubric import PRIORITY_LEVELS, SECTIONS, default_rubric
+
+
+def calculate_regulatory_score(reg_required, reg_deadline, reg_enforcement, rubric=None):
     """Calculate Section 1 score"""
     if reg_required != "YES":
         return 1.0
     
-    score = 0
-    
     # Deadline scoring
-    deadline_scores = {
-        "<3 months": 5,
-        "3-6 months": 4,
-        "6-12 months": 3,
-        ">12 months": 2,
-        "No specific deadline": 2
-    }
-    score = deadline_scores.get(reg_deadline, 1)
+    rubric = rubric or default_rubric()
+    score = rubric.options['reg_deadline'].get(reg_deadline)
     
     # Enforcement adjustment
     if reg_enforcement == "NO":
@@ -22,26 +21,50 @@ def calculate_regulatory_score(reg_required, reg_deadline, reg_enforcement):
     return float(score)
 
 
-def calculate_reputational_score(risk_level, harm_categories, liability):
+# Option codes the scoring rules test for
+_HARM = ENUMS['rep_harm_categories']
+_REPUTATION_BIT = _HARM.bit("Company reputation")
+_HARM_COUNTS = np.array([bin(mask).count('1') for mask in range(1 << len(_HARM.labels))])
+# Dependency penalty and scope bonus options per scoring rules revision
+# (see utils.rubric.SCORING_RULES)
+_HEAVY_DEPENDENCIES = {
+    1: ENUMS['res_external_deps'].bit("Multiple system integrations needed"),
+    2: (
+        ENUMS['res_external_deps'].bit("Third-party vendor required")
+        | ENUMS['res_external_deps'].bit("Multiple system integrations needed")
+    )
+}
+_SCOPE_BONUS = {
+    1: [],
+    2: [ENUMS['op_scope'].code("2+ business units plus external stakeholders")]
+}
+
+
+def _harm_adjustments(masks):
+    """Score deltas (+1, -1 or 0) for an array of affected-parties masks (-1 if unanswered)"""
+    masks = np.maximum(np.asarray(masks, dtype=np.int64), 0)
+    counts = _HARM_COUNTS[masks]
+    reputation = (masks & _REPUTATION_BIT) != 0
+    return np.where((counts >= 3) & ~reputation, 1, np.where(reputation & (counts == 1), -1, 0))
+
+
+def _harm_adjustment(harm_categories):
+    """Score delta from the affected-parties answer (+1, -1 or 0)"""
+    mask = _HARM.code(harm_categories)
+    return int(_harm_adjustments([-1 if mask is None else mask])[0])
+
+
+def calculate_reputational_score(risk_level, harm_categories, liability, rubric=None):
     """Calculate Section 2 score - UPDATED FOR NEW LIABILITY OPTIONS"""
-    risk_mapping = {
-        "1 - Minimal risk": 1,
-        "2 - Low risk, proactive measure": 2,
-        "3 - Moderate risk, potential exposure": 3,
-        "4 - High risk, known vulnerability": 4,
-        "5 - Critical risk, active issue": 5
-    }
-    
-    score = risk_mapping.get(risk_level, 1)
+    rubric = rubric or default_rubric()
+    score = rubric.options['rep_risk_level'].get(risk_level)
     
     # Harm adjustment - UPDATED
-    if harm_categories:
-        harm_list = harm_categories.split(',')
-        # Changed "Company reputation only" to "Company reputation"
-        if len(harm_list) >= 3 and "Company reputation" not in harm_categories:
-            score = min(5, score + 1)
-        elif "Company reputation" in harm_categories and len(harm_list) == 1:
-            score = max(1, score - 1)
+    adjustment = _harm_adjustment(harm_categories)
+    if adjustment > 0:
+        score = min(5, score + 1)
+    elif adjustment < 0:
+        score = max(1, score - 1)
     
     # Liability adjustment
     if liability == ">€1M":
@@ -52,17 +75,10 @@ def calculate_reputational_score(risk_level, harm_categories, liability):
     return float(score)
 
 
-def calculate_strategic_score(strat_document, strat_sponsor, strat_budget):
+def calculate_strategic_score(strat_document, strat_sponsor, strat_budget, rubric=None):
     """Calculate Section 3 score"""
-    doc_scores = {
-        "CEO/Board strategic plan": 5,
-        "Division/BU annual strategy": 4,
-        "Departmental objectives": 3,
-        "Operational improvement": 2,
-        "Not in strategic docs": 1
-    }
-    
-    score = doc_scores.get(strat_document, 1)
+    rubric = rubric or default_rubric()
+    score = rubric.options['strat_document'].get(strat_document)
     
     # Sponsor adjustment
     if strat_sponsor == "NO":
@@ -75,8 +91,9 @@ def calculate_strategic_score(strat_document, strat_sponsor, strat_budget):
     return float(score)
 
 
-def calculate_operational_score(efficiency_gain, scope, blocker):
+def calculate_operational_score(efficiency_gain, scope, blocker, rubric=None):
     """Calculate Section 4 score"""
+    rubric = rubric or default_rubric()
     if efficiency_gain >= 30:
         score = 5
     elif efficiency_gain >= 20:
@@ -89,7 +106,7 @@ def calculate_operational_score(efficiency_gain, scope, blocker):
         score = 1
     
     # Scope adjustment
-    if scope == "3+ business units":
+    if ENUMS['op_scope'].code(scope) in _SCOPE_BONUS[rubric.rules]:
         score = min(5, score + 1)
     
     # Blocker adjustment
@@ -99,17 +116,15 @@ def calculate_operational_score(efficiency_gain, scope, blocker):
     return float(score)
 
 
-def calculate_resource_score(approach, total_hours, external_deps):
+def _has_heavy_dependencies(external_deps, rubric):
+    """True if the external dependencies answer triggers the resource penalty"""
+    return bool((ENUMS['res_external_deps'].code(external_deps) or 0) & _HEAVY_DEPENDENCIES[rubric.rules])
+
+
+def calculate_resource_score(approach, total_hours, external_deps, rubric=None):
     """Calculate Section 5 score (inverted - lower hours = higher score)"""
-    approach_scores = {
-        "Existing tool/platform, configuration only": 5,
-        "Extend existing platform": 4,
-        "New tool, standard implementation": 3,
-        "Custom development": 2,
-        "Major system overhaul": 1
-    }
-    
-    score = approach_scores.get(approach, 3)
+    rubric = rubric or default_rubric()
+    score = rubric.options['res_approach'].get(approach)
     
     # Hours adjustment
     if total_hours < 40:
@@ -124,30 +139,16 @@ def calculate_resource_score(approach, total_hours, external_deps):
         score = max(1, score - 4)
     
     # External dependencies
-    if "Vendor/third-party" in external_deps or "Multiple system integration" in external_deps:
+    if _has_heavy_dependencies(external_deps, rubric):
         score = max(1, score - 1)
     
     return float(score)
 
 
-def calculate_data_score(data_type, third_party, volume):
+def calculate_data_score(data_type, third_party, volume, rubric=None):
     """Calculate Section 6 score"""
-    type_scores = {
-        "GDPR Special Categories": 5,
-        "Financial data": 5,
-        "Trade secrets/IP": 5,
-        "PII with breach notification": 4,
-        "Regular PII": 3,
-        "Internal confidential": 2,
-        "Public/low sensitivity": 1
-    }
-    
-    # Get highest if multiple selected
-    if "," in data_type:
-        types = data_type.split(',')
-        score = max([type_scores.get(t.strip(), 1) for t in types])
-    else:
-        score = type_scores.get(data_type, 1)
+    rubric = rubric or default_rubric()
+    score = rubric.options['data_type'].get(data_type)
     
     # Third party adjustment
     if third_party == "YES":
@@ -160,18 +161,10 @@ def calculate_data_score(data_type, third_party, volume):
     return float(score)
 
 
-def calculate_stakeholder_score(requestor_level, urgency_clear, requestor_history="Unknown"):
+def calculate_stakeholder_score(requestor_level, urgency_clear, requestor_history="Unknown", rubric=None):
     """Calculate Section 7 score"""
-    level_scores = {
-        "External audit finding": 5,
-        "Regulatory inquiry": 5,
-        "Board/C-suite": 4,
-        "Multiple BU heads": 3,
-        "Single BU leadership": 2,
-        "Team/individual": 1
-    }
-    
-    score = level_scores.get(requestor_level, 1)
+    rubric = rubric or default_rubric()
+    score = rubric.options['stake_requestor_level'].get(requestor_level)
     
     # Urgency adjustment
     if urgency_clear == "NO":
@@ -180,17 +173,9 @@ def calculate_stakeholder_score(requestor_level, urgency_clear, requestor_histor
     return float(score)
 
 
-def calculate_total_score(scores):
+def calculate_total_score(scores, rubric=None):
     """Calculate weighted total score"""
-    weights = {
-        'reg': 0.25,
-        'rep': 0.20,
-        'strat': 0.15,
-        'op': 0.15,
-        'res': 0.10,
-        'data': 0.10,
-        'stake': 0.05
-    }
+    weights = (rubric or default_rubric()).weights
     
     total = (
         scores['reg'] * weights['reg'] +
@@ -205,28 +190,271 @@ def calculate_total_score(scores):
     return round(total, 2)
 
 
-def get_priority(total_score):
+def get_priority(total_score, rubric=None):
     """Determine priority level"""
-    if total_score >= 70:
-        return "🔴 IMMEDIATE"
-    elif total_score >= 50:
-        return "🟡 PLANNED"
-    else:
-        return "⚪ DEFER"
+    return (rubric or default_rubric()).get_priority(total_score)
+
+
+# Red flag rules - a flag is raised when all of its conditions hold.
+# Each condition is (column, operator, value); operators are defined in
+# _RULE_OPERATORS. Re-run Admin → Database → Re-evaluate Red Flags after
+# adding a rule so existing projects pick it up.
+RED_FLAG_RULES = [
+    {
+        'flag': "Cannot articulate specific problem",
+        'when': [('op_process_name', 'shorter_than', 10)]
+    },
+    {
+        'flag': "No current state metrics",
+        'when': [('op_current_time', 'is_empty', None)]
+    },
+    {
+        'flag': "Regulatory claim without citation",
+        'when': [('reg_required', 'equals', "YES"), ('reg_citation', 'is_empty', None)]
+    }
+]
+
+
+_RULE_OPERATORS = {
+    'equals': lambda values, value: values == value,
+    'in': lambda values, value: values.isin(value),
+    'is_empty': lambda values, _: values.isna() | values.isin(['', 0]),
+    'shorter_than': lambda values, value: values.astype(object).fillna('').astype(str).str.len() < value,
+    'less_than': lambda values, value: pd.to_numeric(values, errors='coerce') < value
+}
+
+
+def compile_red_flag_rules(rules):
+    """Compile declarative rules into (flag, predicate) pairs.
+    
+    Each predicate takes a DataFrame and returns a boolean array, so a rule
+    is evaluated over a whole table in one pass. Unknown operators fail here
+    rather than at evaluation time.
+    """
+    compiled = []
+    for rule in rules:
+        conditions = []
+        for column, operator, value in rule['when']:
+            if operator not in _RULE_OPERATORS:
+                raise ValueError(f"Unknown red flag operator '{operator}' in rule '{rule['flag']}'")
+            conditions.append((column, _RULE_OPERATORS[operator], value))
+        
+        def predicate(projects, conditions=conditions):
+            matches = np.ones(len(projects), dtype=bool)
+            for column, test, value in conditions:
+                if column in projects.columns:
+                    values = projects[column]
+                else:
+                    values = pd.Series(None, index=projects.index, dtype=object)
+                matches &= test(values, value).to_numpy(dtype=bool)
+            return matches
+        
+        compiled.append((rule['flag'], predicate))
+    return compiled
+
+
+# Columns the red flag rules read, for projected queries
+RED_FLAG_COLUMNS = sorted({column for rule in RED_FLAG_RULES for column, _, _ in rule['when']})
+
+_COMPILED_RED_FLAGS = compile_red_flag_rules(RED_FLAG_RULES)
+
+
+def evaluate_red_flags(projects, compiled_rules=None):
+    """Evaluate red flag rules over a DataFrame of projects.
+    
+    Returns (red_flags, auto_reject) arrays: red_flags holds the raised flags
+    joined with ', ' (None if clean) and auto_reject is 1 where any flag fired.
+    """
+    compiled_rules = compiled_rules or _COMPILED_RED_FLAGS
+    
+    # Encode each row's combination of flags as a bitmask, then build the
+    # text once per distinct combination instead of once per row
+    mask = np.zeros(len(projects), dtype=np.int64)
+    for bit, (_, predicate) in enumerate(compiled_rules):
+        mask |= predicate(projects).astype(np.int64) << bit
+    
+    combos, codes = np.unique(mask, return_inverse=True)
+    labels = np.array([
+        ', '.join(flag for bit, (flag, _) in enumerate(compiled_rules) if combo >> bit & 1) or None
+        for combo in combos
+    ], dtype=object)
+    
+    return labels[codes.reshape(-1)], (mask > 0).astype(np.int64)
 
 
 def check_red_flags(project_data):
     """Check for automatic rejection criteria"""
-    red_flags = []
-    
-    # Check each red flag condition
-    if not project_data.get('op_process_name') or len(project_data.get('op_process_name', '')) < 10:
-        red_flags.append("Cannot articulate specific problem")
-    
-    if not project_data.get('op_current_time') or project_data.get('op_current_time', 0) == 0:
-        red_flags.append("No current state metrics")
+    projects = pd.DataFrame([project_data])
+    return [flag for flag, predicate in _COMPILED_RED_FLAGS if predicate(projects)[0]]
+
+
+# ---------------------------------------------------------------------------
+# Batch scoring
+# ---------------------------------------------------------------------------
+
+# projects columns the section scores are calculated from
+SCORING_INPUTS = [
+    'reg_required', 'reg_deadline', 'reg_enforcement',
+    'rep_risk_level', 'rep_harm_categories', 'rep_liability',
+    'strat_document', 'strat_sponsor', 'strat_budget',
+    'op_efficiency_gain', 'op_scope', 'op_blocker',
+    'res_approach', 'res_total_hours', 'res_external_deps',
+    'data_type', 'data_third_party', 'data_volume',
+    'stake_requestor_level', 'stake_urgency'
+]
+
+SCORE_COLUMNS = [f'{s}_score' for s in SECTIONS]
+
+
+def _codes(projects, name):
+    """Option codes for an answer column stored as codes, labels or a Categorical of labels.
+    
+    Missing answers (and missing columns) are -1, which OptionTable.take maps
+    to the rubric default.
+    """
+    enum = ENUMS[name]
+    if name not in projects.columns:
+        return np.full(len(projects), -1, dtype=np.int64)
+    values = projects[name]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Encode each category once, then map the category codes through
+        category_codes = np.append(enum.encode(values.cat.categories.to_numpy(dtype=object)), -1)
+        return category_codes[values.cat.codes.to_numpy()]
+    if pd.api.types.is_numeric_dtype(values):
+        return enum.check_codes(values)
+    return enum.encode(values.to_numpy(dtype=object))
+
+
+def _column(projects, name):
+    """Column as an object array; missing columns read as all-None"""
+    if name in projects.columns:
+        return projects[name].to_numpy(dtype=object)
+    return np.full(len(projects), None, dtype=object)
+
+
+def _numeric_column(projects, name):
+    """Column as a float array; missing columns read as all-NaN"""
+    if name in projects.columns:
+        return pd.to_numeric(projects[name], errors='coerce').to_numpy(dtype=np.float64)
+    return np.full(len(projects), np.nan)
+
+
+def _per_value(values, func, missing):
+    """Evaluate func once per distinct value and broadcast the result back"""
+    codes, uniques = pd.factorize(values)
+    results = np.array([func(v) for v in uniques] + [missing], dtype=np.float64)
+    # Missing values get code -1, which picks the trailing `missing` entry
+    return results[codes]
+
+
+def _batch_operational_base(projects, rules):
+    """Section 4 score before the blocker adjustment"""
+    gain = _numeric_column(projects, 'op_efficiency_gain')
+    op = np.select([gain >= 30, gain >= 20, gain >= 10, gain >= 5], [5.0, 4.0, 3.0, 2.0], 1.0)
+    return np.where(np.isin(_codes(projects, 'op_scope'), _SCOPE_BONUS[rules]), np.minimum(5, op + 1), op)
+
+
+def infer_op_blocker(projects):
+    """Recover the blocker answer for rows stored before op_blocker existed.
+    
+    The blocker adds one point to the operational score, so it must have been
+    "YES" wherever the stored op_score is above the score without it. Those
+    rows were scored under the original rules (scoring rules 1).
+    """
+    stored = _numeric_column(projects, 'op_score')
+    return np.where(stored > _batch_operational_base(projects, 1), "YES", "NO").astype(object)
+
+
+def calculate_batch_scores(projects, rubric=None):
+    """Score a DataFrame shaped like the projects table in one vectorized pass.
+    
+    Returns a dict of NumPy arrays keyed by column name: the seven section
+    scores (reg_score ... stake_score), total_score and priority. Results
+    match the scalar calculate_*_score functions row for row.
+    
+    Option answers may be stored codes, labels or Categoricals of labels.
+    
+    Answers the form does not store are derived the same way the form does:
+    urgency is clear when stake_urgency is longer than 20 characters, and a
+    missing op_blocker column counts as not blocking.
+    """
+    rubric = rubric or default_rubric()
+    options = rubric.options
+    
+    def answered(name, label):
+        return _codes(projects, name) == ENUMS[name].code(label)
+    
+    # Section 1: Regulatory
+    reg = options['reg_deadline'].take(_codes(projects, 'reg_deadline'))
+    reg = np.where(answered('reg_enforcement', "NO"), np.maximum(1, reg - 1), reg)
+    reg = np.where(answered('reg_required', "YES"), reg, 1.0)
+    
+    # Section 2: Reputational
+    rep = options['rep_risk_level'].take(_codes(projects, 'rep_risk_level'))
+    harm = _harm_adjustments(_codes(projects, 'rep_harm_categories'))
+    rep = np.where(harm > 0, np.minimum(5, rep + 1), np.where(harm < 0, np.maximum(1, rep - 1), rep))
+    rep = np.where(
+        answered('rep_liability', ">€1M"), 5.0,
+        np.where(answered('rep_liability', "€100K-€1M"), np.minimum(5, rep + 1), rep)
+    )
+    
+    # Section 3: Strategic
+    strat = options['strat_document'].take(_codes(projects, 'strat_document'))
+    strat = np.where(answered('strat_sponsor', "NO"), np.maximum(1, strat - 1), strat)
+    strat = np.where(answered('strat_budget', "NO"), np.maximum(1, strat - 1), strat)
+    
+    # Section 4: Operational
+    op = _batch_operational_base(projects, rubric.rules)
+    op = np.where(answered('op_blocker', "YES"), np.minimum(5, op + 1), op)
+    
+    # Section 5: Resources
+    res = options['res_approach'].take(_codes(projects, 'res_approach'))
+    hours = _numeric_column(projects, 'res_total_hours')
+    res = np.select(
+        [hours < 40, hours < 160, hours < 400, hours < 1000],
+        [res, res - 1, res - 2, res - 3],
+        res - 4
+    )
+    res = np.maximum(1, res)
+    heavy = (np.maximum(_codes(projects, 'res_external_deps'), 0) & _HEAVY_DEPENDENCIES[rubric.rules]) != 0
+    res = np.where(heavy, np.maximum(1, res - 1), res)
+    
+    # Section 6: Data Sensitivity
+    data = options['data_type'].take(_codes(projects, 'data_type'))
+    data = np.where(answered('data_third_party', "YES"), np.maximum(4, data), data)
+    data = np.where(_column(projects, 'data_volume') == ">10,000 data subjects", np.minimum(5, data + 1), data)
+    
+    # Section 7: Stakeholder
+    stake = options['stake_requestor_level'].take(_codes(projects, 'stake_requestor_level'))
+    urgency_clear = _per_value(_column(projects, 'stake_urgency'), lambda u: len(u) > 20, 0)
+    stake = np.where(urgency_clear > 0, stake, np.maximum(1, stake - 1))
+    
+    scores = {
+        'reg_score': reg,
+        'rep_score': rep,
+        'strat_score': strat,
+        'op_score': op,
+        'res_score': res,
+        'data_score': data,
+        'stake_score': stake
+    }
     
-    if project_data.get('reg_required') == "YES" and not project_data.get('reg_citation'):
-        red_flags.append("Regulatory claim without citation")
+    # Same operation order as calculate_total_score so results are identical
+    total = scores['reg_score'] * rubric.weights['reg']
+    for section in SECTIONS[1:]:
+        total = total + scores[f'{section}_score'] * rubric.weights[section]
+    scores['total_score'] = np.round(total * 20, 2)
+    scores['priority'] = get_batch_priority(scores['total_score'], rubric)
     
-    return red_flags
+    return scores
+
+
+def get_batch_priority(total_scores, rubric=None):
+    """Vectorized get_priority over an array of total scores"""
+    rubric = rubric or default_rubric()
+    total_scores = np.asarray(total_scores, dtype=np.float64)
+    return np.select(
+        [total_scores >= rubric.immediate_threshold, total_scores >= rubric.planned_threshold],
+        list(PRIORITY_LEVELS[:2]),
+        PRIORITY_LEVELS[2]
+    ).astype(object)
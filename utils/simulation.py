@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from utils.rubric import SECTIONS
+
+
+# Scores are rounded to 2 decimals before thresholds are applied, so a raw
+# total of 69.996 already counts as 70.00
+_ROUNDING_MARGIN = 0.005
+
+
+def generate_weight_candidates(base_weights, n_candidates, concentration=50.0, seed=None):
+    """Random weight vectors around the current weights (row 0 is the current vector).
+    
+    Candidates are drawn from a Dirichlet distribution centred on base_weights,
+    so every row is non-negative and sums to 1. Higher concentration keeps the
+    candidates closer to the current weights.
+    """
+    base = np.array([base_weights[s] for s in SECTIONS], dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    alpha = np.maximum(base * concentration, 1e-3)
+    candidates = rng.dirichlet(alpha, size=max(n_candidates - 1, 0))
+    return np.vstack([base, candidates])
+
+
+def _levels(totals, immediate, planned):
+    """Priority level per total: 2 = IMMEDIATE, 1 = PLANNED, 0 = DEFER"""
+    return (
+        (totals >= immediate - _ROUNDING_MARGIN).astype(np.int8)
+        + (totals >= planned - _ROUNDING_MARGIN).astype(np.int8)
+    )
+
+
+def _weighted_count(mask, row_weights):
+    """Per-candidate count of True cells, each column weighted by its project count"""
+    if row_weights is None:
+        return mask.view(np.uint8).sum(axis=1, dtype=np.int64)
+    return np.rint(mask.astype(np.float32) @ row_weights).astype(np.int64)
+
+
+def _rank_correlation(ranks_a, b):
+    """Spearman rank correlation against precomputed ranks (average ranks for ties)"""
+    ranks_b = pd.Series(b).rank().to_numpy()
+    if ranks_a.std() == 0 or ranks_b.std() == 0:
+        return np.nan
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def simulate_weights(section_scores, departments, candidates, base_weights, immediate, planned,
+                     top_k=20, max_chunk_cells=5_000_000):
+    """Evaluate many weight vectors against the whole portfolio at once.
+    
+    section_scores is an (n_projects x 7) matrix in SECTIONS order and
+    candidates a (n_candidates x 7) matrix of weights. Totals for all
+    candidates are the matrix product scores @ candidates.T, computed in
+    chunks of at most max_chunk_cells values to bound memory.
+    
+    Returns (summary, department_impact):
+    - summary: one row per candidate with its weights, how many projects
+      change priority band (and in which direction) and the mean score shift,
+      sorted by band changes. Rank correlation with the current ordering is
+      computed for the top_k rows only, since it needs a full sort per candidate.
+    - department_impact: mean score change and net band moves per department
+      for those top_k candidates.
+    """
+    scores = np.asarray(section_scores, dtype=np.float32) * 20  # Scale to 100
+    candidates = np.asarray(candidates, dtype=np.float32)
+    base = np.array([base_weights[s] for s in SECTIONS], dtype=np.float32)
+    n_projects, n_candidates = len(scores), len(candidates)
+    
+    current_totals = scores @ base
+    current_levels = _levels(current_totals, immediate, planned)
+    
+    # Projects with identical section scores always move together, so each
+    # distinct score row is evaluated once and weighted by how often it occurs
+    unique_scores, counts = np.unique(scores, axis=0, return_counts=True)
+    unique_levels = _levels(unique_scores @ base, immediate, planned)
+    order = np.argsort(unique_levels, kind='stable')
+    unique_scores, counts, unique_levels = unique_scores[order], counts[order], unique_levels[order]
+    
+    cut_points = np.array([-np.inf, planned - _ROUNDING_MARGIN, immediate - _ROUNDING_MARGIN, np.inf], dtype=np.float32)
+    band_low = cut_points[unique_levels]
+    band_high = cut_points[unique_levels + 1]
+    unique_scores_t = np.ascontiguousarray(unique_scores.T)
+    row_weights = counts.astype(np.float32) if counts.max(initial=1) > 1 else None
+    
+    # Rows are sorted by level: IMMEDIATE rows cannot move up, DEFER rows cannot move down
+    can_move_up = slice(0, int(np.searchsorted(unique_levels, 2)))
+    can_move_down = slice(int(np.searchsorted(unique_levels, 1)), len(unique_levels))
+    
+    moved_up = np.zeros(n_candidates, dtype=np.int64)
+    moved_down = np.zeros(n_candidates, dtype=np.int64)
+    
+    chunk = max(1, max_chunk_cells // max(len(unique_scores), 1))
+    for start in range(0, n_candidates, chunk):
+        totals = candidates[start:start + chunk] @ unique_scores_t
+        moved_up[start:start + chunk] = _weighted_count(
+            totals[:, can_move_up] >= band_high[can_move_up],
+            None if row_weights is None else row_weights[can_move_up]
+        )
+        moved_down[start:start + chunk] = _weighted_count(
+            totals[:, can_move_down] < band_low[can_move_down],
+            None if row_weights is None else row_weights[can_move_down]
+        )
+    changed = moved_up + moved_down
+    
+    # Means are linear in the weights, so they need no per-project totals
+    mean_shift = scores.mean(axis=0) @ (candidates - base).T if n_projects else np.zeros(n_candidates)
+    
+    summary = pd.DataFrame(candidates.astype(np.float64), columns=SECTIONS)
+    summary.insert(0, 'candidate', np.arange(n_candidates))
+    summary['band_changes'] = changed
+    summary['moved_up'] = moved_up
+    summary['moved_down'] = moved_down
+    summary['mean_shift'] = mean_shift
+    summary = summary.sort_values(['band_changes', 'candidate'], ascending=[False, True]).reset_index(drop=True)
+    
+    # Per-candidate detail for the top rows
+    departments = pd.Series(np.asarray(departments, dtype=object)).fillna('Unknown')
+    top = summary.head(top_k)
+    current_ranks = pd.Series(current_totals).rank().to_numpy()
+    correlations = []
+    impact = []
+    for _, row in top.iterrows():
+        weights = candidates[int(row['candidate'])]
+        totals = scores @ weights
+        levels = _levels(totals, immediate, planned)
+        correlations.append(_rank_correlation(current_ranks, totals))
+        
+        by_dept = pd.DataFrame({
+            'department': departments,
+            'score_change': totals - current_totals,
+            'band_move': levels.astype(np.int64) - current_levels
+        }).groupby('department').agg(
+            projects=('score_change', 'size'),
+            mean_score_change=('score_change', 'mean'),
+            net_band_moves=('band_move', 'sum')
+        ).reset_index()
+        by_dept.insert(0, 'candidate', int(row['candidate']))
+        impact.append(by_dept)
+    
+    summary['rank_correlation'] = np.nan
+    if correlations:
+        summary.loc[:len(correlations) - 1, 'rank_correlation'] = correlations
+    department_impact = pd.concat(impact, ignore_index=True) if impact else pd.DataFrame(
+        columns=['candidate', 'department', 'projects', 'mean_score_change', 'net_band_moves']
+    )
+    
+    return summary, department_impact